@@ -1,9 +1,16 @@
 import { NextResponse } from "next/server"
+import {
+  clientHasFreshCopy,
+  conditionalHeaders,
+  getCachedUpstreamBody,
+  rememberUpstreamBody,
+  revalidatedHeaders,
+} from "@/lib/upstream-cache"
 
 const PYTHON_API_BASE_URL = process.env.PYTHON_API_BASE_URL ?? "http://127.0.0.1:8000"
 
 export async function GET(
-  _request: Request,
+  request: Request,
   context: { params: Promise<{ id: string }> }
 ) {
   const { id } = await context.params
@@ -15,11 +22,26 @@ export async function GET(
 
   const upstreamUrl = `${PYTHON_API_BASE_URL}/documents/${encodeURIComponent(docId)}`
 
+  const cacheKey = `document:${docId}`
+  const cached = getCachedUpstreamBody(cacheKey)
+
   try {
-    const upstreamResponse = await fetch(upstreamUrl, { cache: "no-store" })
-    const rawBody = await upstreamResponse.text()
+    const upstreamResponse = await fetch(upstreamUrl, {
+      headers: conditionalHeaders(cached?.etag),
+      cache: "no-store",
+    })
+
+    let rawBody: string
+    let etag: string | null
+    if (upstreamResponse.status === 304 && cached) {
+      rawBody = cached.body
+      etag = cached.etag
+    } else {
+      rawBody = await upstreamResponse.text()
+      etag = upstreamResponse.headers.get("etag")
+    }
 
-    if (!upstreamResponse.ok) {
+    if (!upstreamResponse.ok && upstreamResponse.status !== 304) {
       return NextResponse.json(
         {
           error: "Python document service returned an error",
@@ -29,13 +51,11 @@ export async function GET(
       )
     }
 
-    return new NextResponse(rawBody, {
-      status: 200,
-      headers: {
-        "Content-Type": "application/json",
-        "Cache-Control": "no-store",
-      },
-    })
+    rememberUpstreamBody(cacheKey, etag, rawBody)
+    if (clientHasFreshCopy(request, etag)) {
+      return new NextResponse(null, { status: 304, headers: revalidatedHeaders(etag) })
+    }
+    return new NextResponse(rawBody, { status: 200, headers: revalidatedHeaders(etag) })
   } catch {
     return NextResponse.json({ error: "Python document service unavailable" }, { status: 503 })
   }
@@ -1,4 +1,11 @@
 ﻿import { NextResponse } from "next/server"
+import {
+  clientHasFreshCopy,
+  conditionalHeaders,
+  getCachedUpstreamBody,
+  rememberUpstreamBody,
+  revalidatedHeaders,
+} from "@/lib/upstream-cache"
 
 const PYTHON_SEARCH_URL = process.env.PYTHON_SEARCH_URL ?? "http://127.0.0.1:8000/search"
 const DEFAULT_UPSTREAM_TIMEOUT_MS = 45_000
@@ -13,6 +20,34 @@ function resolveUpstreamTimeoutMs(): number {
 
 interface SearchRequestBody {
   query?: string
+  fields?: string[]
+  snippet?: boolean
+}
+
+function upstreamSearchUrl(query: string, fields: string[] | undefined, snippet: boolean): string {
+  // The API answers conditional requests on GET /search only.
+  const url = new URL(PYTHON_SEARCH_URL)
+  url.searchParams.set("q", query)
+  if (fields) {
+    url.searchParams.set("fields", fields.join(","))
+  }
+  if (snippet) {
+    url.searchParams.set("snippet", "true")
+  }
+  return url.toString()
+}
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const query = searchParams.get("q")?.trim()
+
+  if (!query) {
+    return NextResponse.json({ error: "Query is required" }, { status: 400 })
+  }
+
+  const rawFields = searchParams.get("fields")
+  const fields = rawFields === null ? undefined : rawFields.split(",").map((field) => field.trim()).filter(Boolean)
+  return proxySearch(request, query, fields, searchParams.get("snippet") === "true")
 }
 
 export async function POST(request: Request) {
@@ -30,23 +65,51 @@ export async function POST(request: Request) {
     return NextResponse.json({ error: "Query is required" }, { status: 400 })
   }
 
+  const fields = Array.isArray(body.fields)
+    ? body.fields.filter((field): field is string => typeof field === "string")
+    : undefined
+  return proxySearch(request, query, fields, body.snippet === true)
+}
+
+async function proxySearch(
+  request: Request,
+  query: string,
+  fields: string[] | undefined,
+  snippet: boolean
+): Promise<NextResponse> {
+  const upstreamUrl = upstreamSearchUrl(query, fields, snippet)
+  const cacheKey = `search:${upstreamUrl}`
+  const cached = getCachedUpstreamBody(cacheKey)
+
   try {
     const controller = new AbortController()
     const timeoutId = setTimeout(() => controller.abort(), resolveUpstreamTimeoutMs())
     try {
-      const upstreamResponse = await fetch(PYTHON_SEARCH_URL, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({ query }),
+      const upstreamResponse = await fetch(upstreamUrl, {
+        headers: conditionalHeaders(cached?.etag),
         cache: "no-store",
         signal: controller.signal,
       })
 
-      const rawBody = await upstreamResponse.text()
+      let rawBody: string
+      let etag: string | null
+      if (upstreamResponse.status === 304 && cached) {
+        rawBody = cached.body
+        etag = cached.etag
+      } else {
+        rawBody = await upstreamResponse.text()
+        etag = upstreamResponse.headers.get("etag")
+      }
+
+      if (upstreamResponse.status === 503) {
+        const retryAfter = upstreamResponse.headers.get("retry-after")
+        return NextResponse.json(
+          { error: "Python search service is warming up", details: rawBody },
+          { status: 503, headers: retryAfter ? { "Retry-After": retryAfter } : undefined }
+        )
+      }
 
-      if (!upstreamResponse.ok) {
+      if (!upstreamResponse.ok && upstreamResponse.status !== 304) {
         return NextResponse.json(
           {
             error: "Python search service returned an error",
@@ -56,13 +119,11 @@ export async function POST(request: Request) {
         )
       }
 
-      return new NextResponse(rawBody, {
-        status: 200,
-        headers: {
-          "Content-Type": "application/json",
-          "Cache-Control": "no-store",
-        },
-      })
+      rememberUpstreamBody(cacheKey, etag, rawBody)
+      if (request.method === "GET" && clientHasFreshCopy(request, etag)) {
+        return new NextResponse(null, { status: 304, headers: revalidatedHeaders(etag) })
+      }
+      return new NextResponse(rawBody, { status: 200, headers: revalidatedHeaders(etag) })
     } finally {
       clearTimeout(timeoutId)
     }
@@ -0,0 +1,41 @@
+import { NextResponse } from "next/server"
+
+const PYTHON_API_BASE_URL = process.env.PYTHON_API_BASE_URL ?? "http://127.0.0.1:8000"
+const SUGGEST_UPSTREAM_TIMEOUT_MS = 2_000
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const query = searchParams.get("q")?.trim() ?? ""
+
+  if (!query) {
+    return NextResponse.json({ query, suggestions: [] })
+  }
+
+  const upstreamUrl = `${PYTHON_API_BASE_URL}/suggest?q=${encodeURIComponent(query)}`
+  const controller = new AbortController()
+  const timeoutId = setTimeout(() => controller.abort(), SUGGEST_UPSTREAM_TIMEOUT_MS)
+
+  try {
+    const upstreamResponse = await fetch(upstreamUrl, { cache: "no-store", signal: controller.signal })
+    const rawBody = await upstreamResponse.text()
+
+    if (!upstreamResponse.ok) {
+      return NextResponse.json(
+        { error: "Python suggest service returned an error", details: rawBody },
+        { status: 502 }
+      )
+    }
+
+    return new NextResponse(rawBody, {
+      status: 200,
+      headers: {
+        "Content-Type": "application/json",
+        "Cache-Control": "no-store",
+      },
+    })
+  } catch {
+    return NextResponse.json({ error: "Python suggest service unavailable" }, { status: 503 })
+  } finally {
+    clearTimeout(timeoutId)
+  }
+}
@@ -1,7 +1,12 @@
 "use client"
 
-import { useState, type FormEvent } from "react"
-import { Search } from "lucide-react"
+import { useEffect, useRef, useState, type FormEvent, type KeyboardEvent } from "react"
+import { FileText, Search } from "lucide-react"
+import { getSuggestions } from "@/lib/api"
+import type { Suggestion } from "@/lib/types"
+
+const SUGGEST_DEBOUNCE_MS = 120
+const SUGGEST_MIN_LENGTH = 2
 
 interface SearchBarProps {
   onSearch: (query: string) => void
@@ -10,15 +15,82 @@ interface SearchBarProps {
 
 export function SearchBar({ onSearch, isLoading }: SearchBarProps) {
   const [query, setQuery] = useState("")
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([])
+  const [activeIndex, setActiveIndex] = useState(-1)
+  const [isOpen, setIsOpen] = useState(false)
+  const skipNextFetch = useRef(false)
+
+  useEffect(() => {
+    if (skipNextFetch.current) {
+      skipNextFetch.current = false
+      return
+    }
 
-  function handleSubmit(e: FormEvent) {
-    e.preventDefault()
     const trimmed = query.trim()
+    if (trimmed.length < SUGGEST_MIN_LENGTH) {
+      setSuggestions([])
+      return
+    }
+
+    const controller = new AbortController()
+    const timeoutId = setTimeout(() => {
+      getSuggestions(trimmed, controller.signal)
+        .then((items) => {
+          setSuggestions(items)
+          setActiveIndex(-1)
+          setIsOpen(items.length > 0)
+        })
+        .catch(() => {
+          // Suggestions are optional; a failed lookup just hides the list.
+        })
+    }, SUGGEST_DEBOUNCE_MS)
+
+    return () => {
+      clearTimeout(timeoutId)
+      controller.abort()
+    }
+  }, [query])
+
+  function submit(value: string) {
+    const trimmed = value.trim()
+    setIsOpen(false)
     if (trimmed.length > 0) {
       onSearch(trimmed)
     }
   }
 
+  function pickSuggestion(suggestion: Suggestion) {
+    // The effect only re-runs when the text actually changes; a flag left set
+    // otherwise would swallow the fetch for the next keystroke.
+    if (suggestion.text !== query) {
+      skipNextFetch.current = true
+    }
+    setQuery(suggestion.text)
+    submit(suggestion.text)
+  }
+
+  function handleSubmit(e: FormEvent) {
+    e.preventDefault()
+    if (isOpen && activeIndex >= 0 && suggestions[activeIndex]) {
+      pickSuggestion(suggestions[activeIndex])
+      return
+    }
+    submit(query)
+  }
+
+  function handleKeyDown(e: KeyboardEvent<HTMLInputElement>) {
+    if (!isOpen || suggestions.length === 0) return
+    if (e.key === "ArrowDown") {
+      e.preventDefault()
+      setActiveIndex((index) => (index + 1) % suggestions.length)
+    } else if (e.key === "ArrowUp") {
+      e.preventDefault()
+      setActiveIndex((index) => (index <= 0 ? suggestions.length - 1 : index - 1))
+    } else if (e.key === "Escape") {
+      setIsOpen(false)
+    }
+  }
+
   return (
     <form onSubmit={handleSubmit} className="w-full">
       <div className="relative flex items-center gap-3">
@@ -28,11 +100,46 @@ export function SearchBar({ onSearch, isLoading }: SearchBarProps) {
             type="text"
             value={query}
             onChange={(e) => setQuery(e.target.value)}
+            onKeyDown={handleKeyDown}
+            onFocus={() => setIsOpen(suggestions.length > 0)}
+            onBlur={() => setIsOpen(false)}
             placeholder="Например: хочу оформить отпуск"
             className="w-full h-14 pl-12 pr-4 rounded-xl border border-border bg-card text-foreground placeholder:text-muted-foreground shadow-sm transition-all duration-200 focus:outline-none focus:ring-2 focus:ring-ring/20 focus:border-foreground/20 text-base"
             disabled={isLoading}
             aria-label="Search query"
+            aria-autocomplete="list"
+            aria-expanded={isOpen}
+            role="combobox"
           />
+          {isOpen && suggestions.length > 0 && (
+            <ul
+              role="listbox"
+              className="absolute left-0 right-0 top-full mt-2 z-20 overflow-hidden rounded-xl border border-border bg-card shadow-md"
+            >
+              {suggestions.map((suggestion, index) => (
+                <li
+                  key={`${suggestion.kind}-${suggestion.docId ?? suggestion.text}`}
+                  role="option"
+                  aria-selected={index === activeIndex}
+                  onMouseDown={(e) => {
+                    e.preventDefault()
+                    pickSuggestion(suggestion)
+                  }}
+                  onMouseEnter={() => setActiveIndex(index)}
+                  className={`flex items-center gap-3 px-4 py-2.5 text-sm cursor-pointer ${
+                    index === activeIndex ? "bg-muted text-foreground" : "text-foreground"
+                  }`}
+                >
+                  {suggestion.kind === "title" ? (
+                    <FileText className="h-4 w-4 shrink-0 text-muted-foreground" />
+                  ) : (
+                    <Search className="h-4 w-4 shrink-0 text-muted-foreground" />
+                  )}
+                  <span className="truncate">{suggestion.text}</span>
+                </li>
+              ))}
+            </ul>
+          )}
         </div>
         <button
           type="submit"
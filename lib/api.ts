@@ -1,16 +1,25 @@
-import type { Document, DocumentFormData, SearchResult } from "./types"
+import type { Document, DocumentFormData, SearchResult, Suggestion } from "./types"
 
 interface PythonSearchResult {
   score?: number
   doc_id?: string | number
   title?: string
   text?: string
+  snippet?: string
 }
 
 interface PythonSearchResponse {
   results?: PythonSearchResult[]
 }
 
+interface PythonSuggestResponse {
+  suggestions?: Array<{
+    text?: string
+    kind?: string
+    doc_id?: string
+  }>
+}
+
 interface PythonDocumentPayload {
   found?: boolean
   document?: {
@@ -51,6 +60,7 @@ export interface SearchDocumentPreview {
 const SEARCH_ENDPOINT = "/api/search"
 const ADMIN_DOCS_ENDPOINT = "/api/admin/documents"
 const SEARCH_REQUEST_TIMEOUT_MS = 30_000
+const SEARCH_RESULT_FIELDS = ["score", "doc_id", "title", "snippet"]
 
 function todayIso(): string {
   return new Date().toISOString().slice(0, 10)
@@ -80,7 +90,7 @@ function mapSearchResult(item: PythonSearchResult, index: number): SearchResult
   return {
     id,
     title: item.title?.trim() || `Документ ${id}`,
-    snippet: toSnippet(item.text ?? ""),
+    snippet: item.snippet ?? toSnippet(item.text ?? ""),
     score: typeof item.score === "number" && Number.isFinite(item.score) ? item.score : 0,
   }
 }
@@ -130,15 +140,9 @@ async function fetchWithTimeout(
 export async function searchDocuments(query: string): Promise<SearchResult[]> {
   let response: Response
   try {
-    response = await fetchWithTimeout(
-      SEARCH_ENDPOINT,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ query }),
-      },
-      SEARCH_REQUEST_TIMEOUT_MS,
-    )
+    // GET, so the browser can keep the response and revalidate it by ETag.
+    const params = new URLSearchParams({ q: query, fields: SEARCH_RESULT_FIELDS.join(","), snippet: "true" })
+    response = await fetchWithTimeout(`${SEARCH_ENDPOINT}?${params}`, {}, SEARCH_REQUEST_TIMEOUT_MS)
   } catch (error) {
     if (error instanceof Error && error.name === "AbortError") {
       throw new Error(`Search request timed out after ${SEARCH_REQUEST_TIMEOUT_MS / 1000}s`)
@@ -152,6 +156,20 @@ export async function searchDocuments(query: string): Promise<SearchResult[]> {
   return items.map(mapSearchResult)
 }
 
+export async function getSuggestions(query: string, signal?: AbortSignal): Promise<Suggestion[]> {
+  const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}`, { signal })
+  await assertOk(response, "Suggest request")
+  const payload = (await response.json()) as PythonSuggestResponse
+  const items = Array.isArray(payload.suggestions) ? payload.suggestions : []
+  return items
+    .filter((item) => typeof item.text === "string" && item.text.trim().length > 0)
+    .map((item) => ({
+      text: item.text!.trim(),
+      kind: item.kind === "title" ? "title" : "term",
+      docId: item.doc_id,
+    }))
+}
+
 export async function getSearchDocumentById(id: string): Promise<SearchDocumentPreview | null> {
   const response = await fetch(`/api/document/${encodeURIComponent(id)}`)
   await assertOk(response, "Document request")
@@ -5,6 +5,12 @@ export interface SearchResult {
   score: number
 }
 
+export interface Suggestion {
+  text: string
+  kind: "title" | "term"
+  docId?: string
+}
+
 export interface Document {
   id: string
   title: string
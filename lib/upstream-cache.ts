@@ -0,0 +1,55 @@
+const MAX_ENTRIES = 500
+
+interface CachedUpstreamBody {
+  etag: string
+  body: string
+}
+
+const entries = new Map<string, CachedUpstreamBody>()
+
+export function getCachedUpstreamBody(key: string): CachedUpstreamBody | undefined {
+  const entry = entries.get(key)
+  if (entry) {
+    entries.delete(key)
+    entries.set(key, entry)
+  }
+  return entry
+}
+
+export function rememberUpstreamBody(key: string, etag: string | null, body: string): void {
+  if (!etag) {
+    entries.delete(key)
+    return
+  }
+  entries.delete(key)
+  entries.set(key, { etag, body })
+  if (entries.size > MAX_ENTRIES) {
+    const oldest = entries.keys().next().value
+    if (oldest !== undefined) entries.delete(oldest)
+  }
+}
+
+export function conditionalHeaders(etag: string | undefined): Record<string, string> {
+  return etag ? { "If-None-Match": etag } : {}
+}
+
+export function clientHasFreshCopy(request: Request, etag: string | null): boolean {
+  if (!etag) return false
+  const header = request.headers.get("if-none-match")
+  if (!header) return false
+  return header.split(",").some((candidate) => {
+    const value = candidate.trim()
+    return value === "*" || value === etag || value === `W/${etag}`
+  })
+}
+
+export function revalidatedHeaders(etag: string | null): Record<string, string> {
+  const headers: Record<string, string> = {
+    "Content-Type": "application/json",
+    "Cache-Control": "no-cache",
+  }
+  if (etag) {
+    headers.ETag = etag
+  }
+  return headers
+}
@@ -1,18 +1,30 @@
 import logging
+import math
 import os
 import threading
+from typing import Any, Dict, List, Optional
 
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from pydantic import BaseModel
 
+import change_feed
+import sharding
+import warmup
+import write_manager
 from e5_search import (
-    create_document_core,
-    delete_document_core,
+    DocumentWrite,
+    SearchState,
+    document_etag,
+    documents_only,
     get_document_core,
+    init_documents,
     init_search,
     list_documents_core,
     search_core,
-    update_document_core,
+    search_etag,
+    shard_search_core,
+    suggest_core,
+    validate_fields,
 )
 
 app = FastAPI(title="E5 Semantic Search API")
@@ -20,13 +32,27 @@ logger = logging.getLogger(__name__)
 _warmup_started = False
 _warmup_lock = threading.Lock()
 ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "").strip()
+# Caches may store responses but must revalidate them with the ETag each time.
+CACHE_CONTROL = "no-cache"
 
 
-def _warmup_search_state() -> None:
+def _reload_search_state() -> None:
     try:
-        init_search()
+        init_search(force=True)
     except Exception:
-        logger.exception("Background search warmup failed")
+        logger.exception("Search index reload failed")
+
+
+def _reload_shards() -> None:
+    failed = sharding.broadcast_reload()
+    if failed:
+        logger.warning("Shards did not acknowledge reload: %s", ", ".join(failed))
+
+
+def _after_admin_write() -> None:
+    # With the change feed on, shards pick the write up from Postgres themselves.
+    if sharding.is_coordinator() and not change_feed.is_enabled():
+        threading.Thread(target=_reload_shards, name="shard-reload", daemon=True).start()
 
 
 @app.on_event("startup")
@@ -35,16 +61,49 @@ def start_background_warmup():
     with _warmup_lock:
         if _warmup_started:
             return
-        threading.Thread(
-            target=_warmup_search_state,
-            name="search-warmup",
-            daemon=True,
-        ).start()
+        if sharding.is_coordinator():
+            # No index here, but /suggest still follows the change feed.
+            change_feed.start_listener()
+            _warmup_started = True
+            return
+        if documents_only():
+            warmup.start(init_documents)
+        else:
+            warmup.start(init_search)
+        # Without a search index this still keeps /suggest current.
+        change_feed.start_listener()
+        write_manager.start_writer()
         _warmup_started = True
 
 
 class SearchRequest(BaseModel):
     query: str
+    fields: Optional[List[str]] = None
+    snippet: bool = False
+
+
+# Declared response models let FastAPI serialize straight to JSON bytes via
+# pydantic-core instead of going through jsonable_encoder.
+class SearchResponse(BaseModel):
+    query: str
+    results: List[Dict[str, Any]]
+    partial: Optional[bool] = None
+    failed_shards: Optional[List[str]] = None
+
+
+class ShardSearchResponse(BaseModel):
+    hits: List[Dict[str, Any]]
+
+
+class SuggestResponse(BaseModel):
+    query: str
+    suggestions: List[Dict[str, Any]]
+
+
+class DocumentResponse(BaseModel):
+    found: bool
+    doc_id: Optional[str] = None
+    document: Optional[Dict[str, Any]] = None
 
 
 class DocumentUpsertRequest(BaseModel):
@@ -61,22 +120,152 @@ def _require_admin_token(x_admin_token: str | None = Header(default=None)) -> No
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
-@app.post("/search")
-def search_endpoint(req: SearchRequest):
-    results = search_core(req.query)
-    return {"query": req.query, "results": results}
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def _submit_write(write: DocumentWrite) -> Any:
+    try:
+        return write_manager.submit(write)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except write_manager.WriteTimeoutError as exc:
+        if exc.started:
+            raise HTTPException(status_code=504, detail=str(exc)) from exc
+        raise HTTPException(
+            status_code=503,
+            detail=f"{exc}; the write queue is busy, retry later",
+            headers={"Retry-After": "5"},
+        ) from exc
+
+
+def _ready_search_state() -> SearchState:
+    if documents_only():
+        raise HTTPException(status_code=503, detail="Search is not served in SERVE_MODE=documents")
+    if not warmup.is_ready():
+        # A failed warmup is retried, but only once per WARMUP_RETRY_BACKOFF_S:
+        # a broken model load should not be restarted and waited on by every request.
+        retry_in = warmup.retry_in()
+        if retry_in <= 0:
+            warmup.start(init_search)
+        if retry_in > 0 or not warmup.wait_ready(warmup.WARMUP_WAIT_S):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Search index is not ready (phase: {warmup.status()['phase']})",
+                headers={"Retry-After": str(max(warmup.WARMUP_RETRY_AFTER_S, math.ceil(retry_in)))},
+            )
+    return init_search()
+
+
+def _requested_fields(req: SearchRequest) -> Optional[List[str]]:
+    try:
+        return validate_fields(req.fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _run_search(req: SearchRequest, response: Response, if_none_match: str | None = None):
+    fields = _requested_fields(req)
+    if sharding.is_coordinator():
+        try:
+            merged = sharding.scatter_search(req.query, fields=fields, snippet=req.snippet)
+        except sharding.ShardsUnavailableError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+        return {"query": req.query, **merged}
+
+    state = _ready_search_state()
+    etag = search_etag(state, req.query, fields=fields, snippet=req.snippet)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+
+    response.headers.update(_cache_headers(etag))
+    return {"query": req.query, "results": search_core(req.query, state=state, fields=fields, snippet=req.snippet)}
+
+
+@app.get("/search", response_model=SearchResponse, response_model_exclude_none=True)
+def search_get_endpoint(
+    response: Response,
+    q: str = Query(default=""),
+    fields: str | None = Query(default=None, description="comma-separated result fields"),
+    snippet: bool = False,
+    if_none_match: str | None = Header(default=None),
+):
+    # The cacheable form: HTTP caches key on the URL and revalidate with If-None-Match.
+    requested = [name.strip() for name in fields.split(",") if name.strip()] if fields is not None else None
+    return _run_search(SearchRequest(query=q, fields=requested, snippet=snippet), response, if_none_match)
+
+
+@app.post("/search", response_model=SearchResponse, response_model_exclude_none=True)
+def search_endpoint(req: SearchRequest, response: Response):
+    # Conditional requests are served on GET /search only; a 304 is not a valid
+    # answer to POST (RFC 9110 wants 412 for If-None-Match on unsafe methods).
+    return _run_search(req, response)
+
+
+@app.post("/shard/search", response_model=ShardSearchResponse)
+def shard_search_endpoint(req: SearchRequest):
+    fields = _requested_fields(req)
+    state = _ready_search_state()
+    return {"hits": shard_search_core(req.query, state=state, fields=fields, snippet=req.snippet)}
+
+
+@app.post("/shard/reload")
+def shard_reload_endpoint(x_admin_token: str | None = Header(default=None)):
+    _require_admin_token(x_admin_token)
+    if documents_only():
+        return {"reloading": False}
+    # The current index keeps serving until the rebuilt one replaces it.
+    threading.Thread(
+        target=_reload_search_state,
+        name="search-reload",
+        daemon=True,
+    ).start()
+    return {"reloading": True}
+
+
+@app.get("/suggest", response_model=SuggestResponse)
+def suggest_endpoint(q: str = Query(default="", max_length=200), limit: int = Query(default=8, ge=1, le=20)):
+    return {"query": q, "suggestions": suggest_core(q, limit)}
 
 
 @app.get("/health")
 def health_endpoint():
-    return {"ok": True}
+    # Liveness only; use /ready to know whether searches can be served.
+    return {"ok": True, "ready": sharding.is_coordinator() or warmup.is_ready()}
+
 
+@app.get("/ready")
+def ready_endpoint(response: Response):
+    if sharding.is_coordinator():
+        return {"ready": True, "phase": "coordinator"}
+    status = warmup.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
 
-@app.get("/documents/{doc_id}")
-def get_document_endpoint(doc_id: str):
+
+@app.get("/admin/write-stats")
+def write_stats_endpoint(x_admin_token: str | None = Header(default=None)):
+    _require_admin_token(x_admin_token)
+    return write_manager.write_stats()
+
+
+@app.get("/documents/{doc_id}", response_model=DocumentResponse, response_model_exclude_none=True)
+def get_document_endpoint(doc_id: str, response: Response, if_none_match: str | None = Header(default=None)):
     doc = get_document_core(doc_id)
     if doc is None:
         return {"found": False, "doc_id": doc_id}
+    etag = document_etag(doc)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+    response.headers.update(_cache_headers(etag))
     return {"found": True, "document": doc}
 
 
@@ -91,16 +280,18 @@ def create_document_endpoint(
     req: DocumentUpsertRequest, x_admin_token: str | None = Header(default=None)
 ):
     _require_admin_token(x_admin_token)
-    try:
-        doc = create_document_core(
+    doc = _submit_write(
+        DocumentWrite(
+            op="create",
             title=req.title,
             text=req.text,
             department=req.department,
             access_level=req.access_level,
         )
-        return {"created": True, "document": doc}
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    )
+
+    _after_admin_write()
+    return {"created": True, "document": doc}
 
 
 @app.put("/documents/{doc_id}")
@@ -108,27 +299,30 @@ def update_document_endpoint(
     doc_id: str, req: DocumentUpsertRequest, x_admin_token: str | None = Header(default=None)
 ):
     _require_admin_token(x_admin_token)
-    try:
-        doc = update_document_core(
+    doc = _submit_write(
+        DocumentWrite(
+            op="update",
             doc_id=doc_id,
             title=req.title,
             text=req.text,
             department=req.department,
             access_level=req.access_level,
         )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    )
 
     if doc is None:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    _after_admin_write()
     return {"updated": True, "document": doc}
 
 
 @app.delete("/documents/{doc_id}")
 def delete_document_endpoint(doc_id: str, x_admin_token: str | None = Header(default=None)):
     _require_admin_token(x_admin_token)
-    deleted = delete_document_core(doc_id)
+    deleted = _submit_write(DocumentWrite(op="delete", doc_id=doc_id))
     if not deleted:
         raise HTTPException(status_code=404, detail="Document not found")
+
+    _after_admin_write()
     return {"deleted": True, "doc_id": doc_id}
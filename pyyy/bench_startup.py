@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+IMPORT_BUDGET_MS = float(os.getenv("BENCH_IMPORT_BUDGET_MS", "2000"))
+STARTUP_BUDGET_MS = float(os.getenv("BENCH_STARTUP_BUDGET_MS", "5000"))
+# Must not be imported just by loading the API module.
+HEAVY_MODULES = ("pandas", "psycopg", "sentence_transformers", "torch", "transformers")
+
+WORKDIR = Path(__file__).resolve().parent
+
+_IMPORT_PROBE = """
+import json, sys, time
+started_at = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+print(json.dumps({{"ms": elapsed_ms, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    # A fresh interpreter each time, otherwise everything after the first run is cached.
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=WORKDIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def measure_startup(env: Dict[str, str], timeout_s: float) -> Dict[str, Optional[float]]:
+    port = _free_port()
+    started_at = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "api:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=WORKDIR,
+        env=env,
+    )
+    try:
+        deadline = started_at + timeout_s
+        healthy_at = _wait_for(f"http://127.0.0.1:{port}/health", deadline)
+        ready_at = _wait_for(f"http://127.0.0.1:{port}/ready", deadline) if healthy_at else None
+    finally:
+        process.terminate()
+        process.wait()
+
+    def _ms(moment: Optional[float]) -> Optional[float]:
+        return (moment - started_at) * 1000.0 if moment is not None else None
+
+    return {"health_ms": _ms(healthy_at), "ready_ms": _ms(ready_at)}
+
+
+def _median(values: List[Optional[float]]) -> Optional[float]:
+    present = [value for value in values if value is not None]
+    return statistics.median(present) if len(present) == len(values) and present else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure API import and startup time against budgets.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="documents", help="SERVE_MODE for the startup measurement")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--startup-timeout-s", type=float, default=120.0)
+    parser.add_argument("--skip-startup", action="store_true", help="only measure imports")
+    args = parser.parse_args()
+
+    env = {**os.environ, "SERVE_MODE": args.mode, "PYTHONDONTWRITEBYTECODE": "1"}
+    failures: List[str] = []
+
+    for module in ("e5_search", "api"):
+        probes = [measure_import(module, env) for _ in range(args.runs)]
+        median_ms = statistics.median(probe["ms"] for probe in probes)
+        loaded = sorted({name for probe in probes for name in probe["loaded"]})
+        print(f"import {module}: median {median_ms:.0f} ms over {args.runs} runs, heavy modules: {loaded or 'none'}")
+        if loaded:
+            failures.append(f"import {module} pulled in {', '.join(loaded)}")
+        if module == "api" and median_ms > args.import_budget_ms:
+            failures.append(f"import api took {median_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+
+    if not args.skip_startup:
+        samples = [measure_startup(env, args.startup_timeout_s) for _ in range(args.runs)]
+        health_ms = _median([sample["health_ms"] for sample in samples])
+        ready_ms = _median([sample["ready_ms"] for sample in samples])
+        print(
+            f"startup SERVE_MODE={args.mode}: /health "
+            f"{'timeout' if health_ms is None else f'{health_ms:.0f} ms'}, /ready "
+            f"{'timeout' if ready_ms is None else f'{ready_ms:.0f} ms'} (median of {args.runs})"
+        )
+        if ready_ms is None:
+            failures.append(f"/ready did not return 200 within {args.startup_timeout_s:.0f}s")
+        elif ready_ms > args.startup_budget_ms:
+            failures.append(f"startup to /ready took {ready_ms:.0f} ms (budget {args.startup_budget_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import logging
+import os
+import threading
+import time
+
+import db
+from e5_search import sync_changes
+
+
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED", "1").strip().lower() not in {"0", "false", "no", "off"}
+# NOTIFY is best-effort (dropped while disconnected), so the change-log table
+# is also polled at this interval as a safety net.
+CHANGE_FEED_POLL_S = float(os.getenv("CHANGE_FEED_POLL_S", "30"))
+CHANGE_FEED_RETRY_S = float(os.getenv("CHANGE_FEED_RETRY_S", "5"))
+# Change-log rows older than this are deleted; a subscriber that fell further
+# behind sees a reset and reloads the whole corpus.
+CHANGE_RETENTION_S = float(os.getenv("CHANGE_RETENTION_S", str(7 * 24 * 3600)))
+CHANGE_PRUNE_INTERVAL_S = float(os.getenv("CHANGE_PRUNE_INTERVAL_S", "3600"))
+
+logger = logging.getLogger(__name__)
+_listener_started = False
+_listener_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def is_enabled() -> bool:
+    return CHANGE_FEED_ENABLED and db.is_enabled()
+
+
+def _sync() -> None:
+    applied = sync_changes()
+    if applied:
+        logger.info("Applied %d document change(s) from the change feed", applied)
+
+
+def _prune_if_due() -> None:
+    global _last_prune
+    if CHANGE_RETENTION_S <= 0 or time.monotonic() - _last_prune < CHANGE_PRUNE_INTERVAL_S:
+        return
+    _last_prune = time.monotonic()
+    pruned = db.prune_changes(CHANGE_RETENTION_S)
+    if pruned:
+        logger.info("Pruned %d change-log row(s) older than %.0fs", pruned, CHANGE_RETENTION_S)
+
+
+def _listen_forever() -> None:
+    while True:
+        try:
+            with db.listen_connection() as conn:
+                # Catch up on anything committed while we were not listening.
+                _sync()
+                while True:
+                    for _ in conn.notifies(timeout=CHANGE_FEED_POLL_S, stop_after=1):
+                        pass
+                    _sync()
+                    _prune_if_due()
+        except Exception:
+            logger.exception("Change feed listener failed; reconnecting in %.0fs", CHANGE_FEED_RETRY_S)
+            time.sleep(CHANGE_FEED_RETRY_S)
+
+
+def start_listener() -> bool:
+    global _listener_started
+    if not is_enabled():
+        return False
+
+    with _listener_lock:
+        if _listener_started:
+            return True
+        threading.Thread(target=_listen_forever, name="change-feed", daemon=True).start()
+        _listener_started = True
+    return True
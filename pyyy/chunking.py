@@ -0,0 +1,185 @@
+import argparse
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+CHUNK_MODE = os.getenv("CHUNK_MODE", "tokens").strip().lower()
+# 0 means "the encoder's own sequence limit".
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+MIN_TEXT_TOKENS = 32
+MAX_ENCODER_TOKENS = 512
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+@lru_cache(maxsize=2)
+def load_tokenizer(model_name: str) -> Any:
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+
+
+def encoder_token_limit(tokenizer: Any) -> int:
+    if CHUNK_TOKENS > 0:
+        return CHUNK_TOKENS
+    limit = int(getattr(tokenizer, "model_max_length", MAX_ENCODER_TOKENS) or MAX_ENCODER_TOKENS)
+    # HF reports a huge sentinel when the config has no limit.
+    return min(limit, MAX_ENCODER_TOKENS)
+
+
+def split_sentences(text: str) -> List[str]:
+    normalized = str(text).replace("\r\n", "\n").strip()
+    return [part.strip() for part in _SENTENCE_SPLIT.split(normalized) if part and part.strip()]
+
+
+def text_token_budget(tokenizer: Any, passage_header: str) -> int:
+    header_tokens = len(tokenizer(passage_header, add_special_tokens=True)["input_ids"])
+    return max(MIN_TEXT_TOKENS, encoder_token_limit(tokenizer) - header_tokens)
+
+
+def pack_sentences(
+    sentences: Sequence[str],
+    token_counts: Sequence[int],
+    char_offsets: Sequence[Sequence[Tuple[int, int]]],
+    budget: int,
+    overlap: int = 0,
+) -> List[Tuple[str, int, int]]:
+    # Returns (chunk, tokens, overlap_chars): the chunk opens with overlap_chars
+    # characters (separator included) repeated from the previous chunk.
+    overlap = max(0, min(overlap, budget // 2))
+    chunks: List[Tuple[str, int, int]] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+    carried = 0
+
+    def _flush(carry: bool) -> None:
+        nonlocal current, current_tokens, carried
+        if len(current) > carried:
+            text = " ".join(sentence for sentence, _ in current)
+            overlap_chars = len(" ".join(sentence for sentence, _ in current[:carried])) + 1 if carried else 0
+            chunks.append((text, current_tokens, overlap_chars))
+        tail: List[Tuple[str, int]] = []
+        tail_tokens = 0
+        if carry and overlap:
+            for sentence, count in reversed(current):
+                if tail_tokens + count > overlap:
+                    break
+                tail.insert(0, (sentence, count))
+                tail_tokens += count
+        current, current_tokens, carried = tail, tail_tokens, len(tail)
+
+    for sentence, count, offsets in zip(sentences, token_counts, char_offsets):
+        if count > budget:
+            # A single sentence over budget is cut on token boundaries; the last
+            # window stays open so following sentences can still fill it up.
+            _flush(carry=False)
+            for start in range(0, count, budget):
+                window = offsets[start : start + budget]
+                part = " ".join(sentence[window[0][0] : window[-1][1]].split())
+                if not part:
+                    continue
+                _flush(carry=False)
+                current, current_tokens = [(part, len(window))], len(window)
+            continue
+
+        if current and current_tokens + count > budget:
+            _flush(carry=True)
+        # Stored chunk text is whitespace-normalized, so overlap_chars is measured on that form.
+        current.append((" ".join(sentence.split()), count))
+        current_tokens += count
+
+    _flush(carry=False)
+    return chunks
+
+
+def split_by_tokens(
+    text: str,
+    model_name: str,
+    passage_header: str = "",
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> List[Tuple[str, int, int]]:
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+
+    tokenizer = load_tokenizer(model_name)
+    encoded = tokenizer(sentences, add_special_tokens=False, return_offsets_mapping=True)
+    token_counts = [len(ids) for ids in encoded["input_ids"]]
+    budget = text_token_budget(tokenizer, passage_header)
+    return pack_sentences(sentences, token_counts, encoded["offset_mapping"], budget, overlap)
+
+
+def strip_overlap(text: str, overlap_chars: int) -> str:
+    # Only what the chunker recorded as repeated is dropped; chunks written
+    # without overlap are returned untouched.
+    if overlap_chars <= 0 or overlap_chars >= len(text):
+        return text
+    return text[overlap_chars:].lstrip()
+
+
+def token_stats(token_counts: Sequence[int], limit: int) -> Dict[str, float]:
+    if not token_counts:
+        return {"chunks": 0}
+    counts = np.asarray(token_counts, dtype=np.int64)
+    return {
+        "chunks": int(counts.size),
+        "tokens_total": int(counts.sum()),
+        "tokens_mean": round(float(counts.mean()), 1),
+        "tokens_p50": int(np.percentile(counts, 50)),
+        "tokens_p95": int(np.percentile(counts, 95)),
+        "tokens_max": int(counts.max()),
+        "truncated_chunks": int((counts > limit).sum()),
+        "truncated_tokens": int(np.clip(counts - limit, 0, None).sum()),
+        "fill_ratio": round(float(np.minimum(counts, limit).mean() / limit), 3),
+    }
+
+
+def passage_token_counts(model_name: str, passages: List[str]) -> List[int]:
+    tokenizer = load_tokenizer(model_name)
+    return [len(ids) for ids in tokenizer(passages, add_special_tokens=True)["input_ids"]]
+
+
+def rechunk_corpus() -> int:
+    # Chunks already stored keep the split they were written with; this
+    # re-splits every document under the current CHUNK_* settings.
+    import e5_search
+
+    df, _ = e5_search._load_docs_state()
+    doc_ids = sorted(set(df["doc_id"].astype(str)) - {""})
+    writes = [e5_search.DocumentWrite(op="rechunk", doc_id=doc_id) for doc_id in doc_ids]
+    return sum(result is True for result in e5_search.apply_write_batch(writes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report chunk token statistics for the corpus.")
+    parser.add_argument("--rechunk", action="store_true", help="re-split stored documents with the current settings")
+    args = parser.parse_args()
+
+    import e5_search
+
+    if args.rechunk:
+        print(f"rechunked documents: {rechunk_corpus()}")
+
+    df, _ = e5_search._load_docs_state()
+    tokenizer = load_tokenizer(e5_search.MODEL_NAME)
+    limit = encoder_token_limit(tokenizer)
+
+    current = passage_token_counts(e5_search.MODEL_NAME, e5_search._build_passages(df))
+    print(f"model={e5_search.MODEL_NAME} limit={limit} tokens")
+    print("current chunks:", token_stats(current, limit))
+
+    rechunked: List[int] = []
+    for doc in e5_search._list_documents_from_df(df):
+        chunks = e5_search._split_text_to_chunks(doc["text"], title=doc["title"])
+        passages = [e5_search._passage_text(doc["title"], chunk) for chunk, _ in chunks]
+        rechunked.extend(passage_token_counts(e5_search.MODEL_NAME, passages))
+    print(f"{CHUNK_MODE} chunking:", token_stats(rechunked, limit))
+
+
+if __name__ == "__main__":
+    main()
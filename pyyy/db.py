@@ -1,11 +1,19 @@
+from __future__ import annotations
+
 import os
-from typing import Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lazy import lazy_import
 
-import pandas as pd
-import psycopg
+# Imported on first use: CSV-only and light processes never load them.
+pd = lazy_import("pandas")
+psycopg = lazy_import("psycopg")
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
+CHANGE_CHANNEL = "document_changes"
+CHANGE_LOCK_KEY = 51_402_317
 _SCHEMA_READY = False
 
 
@@ -48,15 +56,49 @@ def ensure_schema() -> None:
                 )
                 """
             )
+            # Leading characters repeated from the previous chunk (0 = no overlap).
+            cur.execute(
+                "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS overlap_chars INTEGER NOT NULL DEFAULT 0"
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS document_changes (
+                    seq BIGSERIAL PRIMARY KEY,
+                    doc_id TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS document_changes_pruned (
+                    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                    seq BIGINT NOT NULL
+                )
+                """
+            )
         conn.commit()
 
     _SCHEMA_READY = True
 
 
-def load_docs_df() -> pd.DataFrame:
-    ensure_schema()
-    with _connect() as conn:
-        query = """
+DOC_COLUMNS = [
+    "doc_id",
+    "chunk_id",
+    "title",
+    "department",
+    "access_level",
+    "text",
+    "created_at",
+    "updated_at",
+    "overlap_chars",
+]
+
+
+def _docs_query(filtered: bool) -> str:
+    where = "WHERE d.doc_id = ANY(%s)" if filtered else ""
+    return f"""
             SELECT
                 d.doc_id,
                 c.chunk_id,
@@ -65,12 +107,20 @@ def load_docs_df() -> pd.DataFrame:
                 d.access_level,
                 c.text,
                 d.created_at,
-                d.updated_at
+                d.updated_at,
+                c.overlap_chars
             FROM documents d
             JOIN document_chunks c ON c.doc_id = d.doc_id
+            {where}
             ORDER BY d.doc_id, c.chunk_index
         """
-        df = pd.read_sql_query(query, conn)
+
+
+def load_docs_df(doc_ids: Optional[List[str]] = None) -> pd.DataFrame:
+    ensure_schema()
+    with _connect() as conn:
+        params = (list(doc_ids),) if doc_ids is not None else None
+        df = pd.read_sql_query(_docs_query(doc_ids is not None), conn, params=params)
     return df
 
 
@@ -83,8 +133,7 @@ def has_any_documents() -> bool:
     return bool(row and row[0])
 
 
-def save_docs_df(df: pd.DataFrame) -> None:
-    ensure_schema()
+def _split_docs_and_chunks(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     normalized = df.fillna("").copy()
 
     docs = (
@@ -100,43 +149,187 @@ def save_docs_df(df: pd.DataFrame) -> None:
         lambda row: f"{str(row['doc_id'])}_C{int(row['chunk_index']):02d}",
         axis=1,
     )
+    return docs, chunks
+
+
+def _insert_docs_and_chunks(cur, docs: pd.DataFrame, chunks: pd.DataFrame) -> None:
+    for doc in docs.itertuples(index=False):
+        cur.execute(
+            """
+            INSERT INTO documents (
+                doc_id, title, department, access_level, created_at, updated_at
+            )
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (doc_id) DO UPDATE SET
+                title = EXCLUDED.title,
+                department = EXCLUDED.department,
+                access_level = EXCLUDED.access_level,
+                created_at = EXCLUDED.created_at,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (
+                str(doc.doc_id),
+                str(doc.title),
+                str(doc.department or "general"),
+                str(doc.access_level or "internal"),
+                str(doc.created_at),
+                str(doc.updated_at),
+            ),
+        )
+
+    for chunk in chunks.itertuples(index=False):
+        cur.execute(
+            """
+            INSERT INTO document_chunks (
+                doc_id, chunk_id, chunk_index, text, overlap_chars
+            )
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (
+                str(chunk.doc_id),
+                str(chunk.chunk_id),
+                int(chunk.chunk_index),
+                str(chunk.text),
+                int(getattr(chunk, "overlap_chars", 0) or 0),
+            ),
+        )
+
+
+def _lock_changes(cur) -> None:
+    # Writers take turns so change seqs become visible in commit order and a
+    # subscriber reading "seq > last" never skips a late-committing change.
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (CHANGE_LOCK_KEY,))
+
+
+def _record_change(cur, doc_id: str, op: str) -> int:
+    cur.execute(
+        "INSERT INTO document_changes (doc_id, op) VALUES (%s, %s) RETURNING seq",
+        (doc_id, op),
+    )
+    return int(cur.fetchone()[0])
+
+
+def _notify(cur, seq: int) -> None:
+    # Delivered to listeners only when the surrounding transaction commits.
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANGE_CHANNEL, str(seq)))
+
+
+def save_docs_df(df: pd.DataFrame) -> None:
+    ensure_schema()
+    docs, chunks = _split_docs_and_chunks(df)
 
     with _connect() as conn:
         with conn.cursor() as cur:
+            _lock_changes(cur)
             cur.execute("DELETE FROM document_chunks")
             cur.execute("DELETE FROM documents")
+            _insert_docs_and_chunks(cur, docs, chunks)
+            _notify(cur, _record_change(cur, "*", "reset"))
+        conn.commit()
 
-            for doc in docs.itertuples(index=False):
-                cur.execute(
-                    """
-                    INSERT INTO documents (
-                        doc_id, title, department, access_level, created_at, updated_at
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        str(doc.doc_id),
-                        str(doc.title),
-                        str(doc.department or "general"),
-                        str(doc.access_level or "internal"),
-                        str(doc.created_at),
-                        str(doc.updated_at),
-                    ),
-                )
 
-            for chunk in chunks.itertuples(index=False):
-                cur.execute(
-                    """
-                    INSERT INTO document_chunks (
-                        doc_id, chunk_id, chunk_index, text
-                    )
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (
-                        str(chunk.doc_id),
-                        str(chunk.chunk_id),
-                        int(chunk.chunk_index),
-                        str(chunk.text),
-                    ),
-                )
+@contextmanager
+def write_transaction() -> Iterator:
+    ensure_schema()
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            _lock_changes(cur)
+            yield cur
         conn.commit()
+
+
+def max_doc_number(cur) -> int:
+    cur.execute(
+        """
+        SELECT COALESCE(MAX(CAST(SUBSTRING(doc_id FROM 4) AS INTEGER)), 0)
+        FROM documents
+        WHERE doc_id ~ '^DOC[0-9]+$'
+        """
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def load_doc_rows(cur, doc_ids: List[str]) -> pd.DataFrame:
+    if not doc_ids:
+        return pd.DataFrame(columns=DOC_COLUMNS)
+    cur.execute(_docs_query(True), (list(doc_ids),))
+    return pd.DataFrame(cur.fetchall(), columns=DOC_COLUMNS)
+
+
+def write_document_changes(cur, upserts: Dict[str, pd.DataFrame], deletes: List[str]) -> int:
+    last_seq = 0
+    for doc_id, rows in upserts.items():
+        docs, chunks = _split_docs_and_chunks(rows)
+        cur.execute("DELETE FROM document_chunks WHERE doc_id = %s", (doc_id,))
+        _insert_docs_and_chunks(cur, docs, chunks)
+        last_seq = _record_change(cur, doc_id, "upsert")
+
+    for doc_id in deletes:
+        cur.execute("DELETE FROM documents WHERE doc_id = %s", (doc_id,))
+        last_seq = _record_change(cur, doc_id, "delete")
+
+    if last_seq:
+        _notify(cur, last_seq)
+    return last_seq
+
+
+def latest_change_seq() -> int:
+    ensure_schema()
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT GREATEST(
+                    (SELECT COALESCE(MAX(seq), 0) FROM document_changes),
+                    (SELECT COALESCE(MAX(seq), 0) FROM document_changes_pruned)
+                )
+                """
+            )
+            row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def fetch_changes_since(seq: int) -> List[Tuple[int, str, str]]:
+    ensure_schema()
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT seq, doc_id, op FROM document_changes WHERE seq > %s ORDER BY seq",
+                (seq,),
+            )
+            rows = cur.fetchall()
+            cur.execute("SELECT seq FROM document_changes_pruned")
+            pruned = cur.fetchone()
+
+    changes = [(int(row[0]), str(row[1]), str(row[2])) for row in rows]
+    if pruned and seq < int(pruned[0]):
+        # Changes this subscriber never saw were pruned: it has to reload everything.
+        changes.insert(0, (int(pruned[0]), "*", "reset"))
+    return changes
+
+
+def prune_changes(retention_s: float) -> int:
+    # Runs under the writers' lock so the watermark and deleted rows stay consistent.
+    with write_transaction() as cur:
+        cur.execute(
+            "DELETE FROM document_changes WHERE changed_at < now() - make_interval(secs => %s) RETURNING seq",
+            (retention_s,),
+        )
+        pruned = [int(row[0]) for row in cur.fetchall()]
+        if pruned:
+            cur.execute(
+                """
+                INSERT INTO document_changes_pruned (id, seq) VALUES (1, %s)
+                ON CONFLICT (id) DO UPDATE SET seq = GREATEST(document_changes_pruned.seq, EXCLUDED.seq)
+                """,
+                (max(pruned),),
+            )
+    return len(pruned)
+
+
+def listen_connection():
+    ensure_schema()
+    conn = psycopg.connect(DATABASE_URL, autocommit=True)
+    conn.execute(f"LISTEN {CHANGE_CHANNEL}")
+    return conn
@@ -1,16 +1,31 @@
+from __future__ import annotations
+
 import hashlib
+import logging
 import os
 import re
+import tempfile
+import threading
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import numpy as np
-import pandas as pd
-from sentence_transformers import SentenceTransformer
 
+import chunking
 import db
+import rebuild_index
+import suggest
+import warmup
+from lazy import lazy_import
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# pandas and sentence_transformers (with torch) are imported on first use so
+# document-only processes start without them.
+pd = lazy_import("pandas")
 
 
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "intfloat/multilingual-e5-base")
@@ -21,9 +36,22 @@ MAX_CHUNKS_PER_DOC = int(os.getenv("MAX_CHUNKS_PER_DOC", "2"))
 MIN_SCORE = float(os.getenv("MIN_SCORE", "0.30"))
 
 QUERY_PREFIX = "query: "
+# Share of the wrapped-prompt vector mixed into longer queries; 0 disables wrapping.
+QUERY_WRAP_WEIGHT = float(os.getenv("QUERY_WRAP_WEIGHT", "0.25"))
 PASSAGE_PREFIX = "passage: "
 CHUNK_SIZE = int(os.getenv("DOC_CHUNK_SIZE", "900"))
 
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "220"))
+RESULT_FIELDS = ("score", "doc_id", "chunk_id", "title", "text", "snippet")
+_INTERNAL_HIT_KEYS = ("rank_score", "row")
+_SENTENCE_END = re.compile(r"[.!?…]+(?=\s|$)")
+
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+
+# "documents" serves document/admin endpoints only and never loads the model.
+SERVE_MODE = os.getenv("SERVE_MODE", "all").strip().lower()
+
 CSV_CANDIDATES = [
     "data/docs.csv",
     "../incoming/docs.csv",
@@ -37,9 +65,33 @@ class SearchState:
     df: pd.DataFrame
     passage_embs: np.ndarray
     csv_path: str
+    sentence_offsets: List[np.ndarray]
+    signature: str
+    change_seq: int = 0
+
 
+@dataclass(frozen=True)
+class SearchParams:
+    top_chunks: int = TOP_CHUNKS
+    top_results: int = TOP_RESULTS
+    max_chunks_per_doc: int = MAX_CHUNKS_PER_DOC
+    min_score: float = MIN_SCORE
+    wrap_weight: float = QUERY_WRAP_WEIGHT
+    lexical_bonus: bool = True
+
+
+DEFAULT_PARAMS = SearchParams()
 
 _STATE: Optional[SearchState] = None
+_INDEX_LOCK = threading.Lock()
+# Single-flight guard so concurrent callers never load the model or embed twice.
+_INIT_LOCK = threading.Lock()
+_RESET_RELOADING = False
+_SUGGESTIONS: Optional[suggest.SuggestIndex] = None
+# Change seq the suggestion index reflects; processes without a search index
+# (coordinator, SERVE_MODE=documents) still keep suggestions current with it.
+_SUGGESTIONS_SEQ = 0
+logger = logging.getLogger(__name__)
 
 
 def _model_slug() -> str:
@@ -92,6 +144,7 @@ def _ensure_admin_columns(df: pd.DataFrame) -> pd.DataFrame:
         ("text", ""),
         ("created_at", ""),
         ("updated_at", ""),
+        ("overlap_chars", 0),
     ]:
         if col not in df.columns:
             df[col] = default
@@ -99,6 +152,7 @@ def _ensure_admin_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.fillna("").copy()
     for col in ("doc_id", "chunk_id", "title", "department", "access_level", "text"):
         df[col] = df[col].astype(str)
+    df["overlap_chars"] = pd.to_numeric(df["overlap_chars"], errors="coerce").fillna(0).astype(int)
 
     df["title"] = df["title"].map(normalize_text)
     df["text"] = df["text"].map(normalize_text)
@@ -141,25 +195,42 @@ def load_docs(csv_path: str) -> pd.DataFrame:
     return _ensure_admin_columns(df)
 
 
+def _ensure_db_seeded(csv_path: Optional[str] = None) -> None:
+    if not db.has_any_documents():
+        seed_path = csv_path or pick_csv_path()
+        db.save_docs_df(load_docs(seed_path))
+
+
 def _load_docs_state(csv_path: Optional[str] = None) -> tuple[pd.DataFrame, str]:
     if db.is_enabled():
-        if not db.has_any_documents():
-            seed_path = csv_path or pick_csv_path()
-            db.save_docs_df(load_docs(seed_path))
+        _ensure_db_seeded(csv_path)
         return _ensure_admin_columns(db.load_docs_df()), "database://documents"
 
     resolved_csv_path = csv_path or pick_csv_path()
     return load_docs(resolved_csv_path), resolved_csv_path
 
 
+def shard_of(doc_id: str, shard_count: int) -> int:
+    digest = hashlib.md5(str(doc_id).strip().encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % max(1, shard_count)
+
+
+def _partition_for_shard(df: pd.DataFrame) -> pd.DataFrame:
+    if SHARD_COUNT <= 1:
+        return df
+    owned = df["doc_id"].astype(str).map(lambda doc_id: shard_of(doc_id, SHARD_COUNT) == SHARD_INDEX)
+    return df[owned].reset_index(drop=True)
+
+
 def _index_cache_path(csv_path: str) -> str:
+    shard_suffix = f".shard{SHARD_INDEX}of{SHARD_COUNT}" if SHARD_COUNT > 1 else ""
     if csv_path.startswith("database://"):
         data_dir = Path(__file__).resolve().parent / "data"
         data_dir.mkdir(parents=True, exist_ok=True)
-        return str(data_dir / f"documents.{_model_slug()}.embeddings.npz")
+        return str(data_dir / f"documents{shard_suffix}.{_model_slug()}.embeddings.npz")
 
     csv_file = Path(csv_path)
-    return str(csv_file.with_name(f"{csv_file.stem}.{_model_slug()}.embeddings.npz"))
+    return str(csv_file.with_name(f"{csv_file.stem}{shard_suffix}.{_model_slug()}.embeddings.npz"))
 
 
 def _docs_signature(df: pd.DataFrame) -> str:
@@ -168,6 +239,10 @@ def _docs_signature(df: pd.DataFrame) -> str:
     return hashlib.sha256(joined.encode("utf-8")).hexdigest()
 
 
+def _passage_keys(passages: List[str]) -> np.ndarray:
+    return np.array([hashlib.sha1(passage.encode("utf-8")).hexdigest() for passage in passages])
+
+
 def _load_cached_embeddings(csv_path: str, df: pd.DataFrame) -> Optional[np.ndarray]:
     cache_path = Path(_index_cache_path(csv_path))
     if not cache_path.exists():
@@ -188,25 +263,59 @@ def _load_cached_embeddings(csv_path: str, df: pd.DataFrame) -> Optional[np.ndar
         return None
 
 
+def _load_reusable_embeddings(csv_path: str) -> tuple[Dict[str, int], Optional[np.ndarray]]:
+    cache_path = Path(_index_cache_path(csv_path))
+    if not cache_path.exists():
+        return {}, None
+
+    try:
+        with np.load(cache_path, allow_pickle=False) as cached:
+            if "keys" not in cached.files:
+                return {}, None
+            keys = [str(key) for key in cached["keys"]]
+            embeddings = cached["embeddings"].astype(np.float32, copy=False)
+    except Exception:
+        return {}, None
+
+    if len(keys) != embeddings.shape[0]:
+        return {}, None
+    return {key: position for position, key in enumerate(keys)}, embeddings
+
+
 def _save_cached_embeddings(csv_path: str, df: pd.DataFrame, embeddings: np.ndarray) -> None:
-    np.savez_compressed(
-        _index_cache_path(csv_path),
-        embeddings=np.asarray(embeddings, dtype=np.float32),
-        signature=np.array(_docs_signature(df)),
-    )
+    # Written to a temp file of its own and renamed, so neither a concurrent
+    # reader nor another writer ever sees a partial npz.
+    cache_path = _index_cache_path(csv_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                embeddings=np.asarray(embeddings, dtype=np.float32),
+                signature=np.array(_docs_signature(df)),
+                keys=_passage_keys(_build_passages(df)),
+            )
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _passage_text(title: str, text: str) -> str:
+    title = normalize_text(title)
+    text = normalize_text(text)
+    if title:
+        payload = f"Заголовок: {title}\nТекст: {text}"
+    else:
+        payload = f"Текст: {text}"
+    return PASSAGE_PREFIX + payload
 
 
 def _build_passages(df: pd.DataFrame) -> List[str]:
-    passages: List[str] = []
-    for row in df.itertuples(index=False):
-        title = normalize_text(getattr(row, "title", ""))
-        text = normalize_text(getattr(row, "text", ""))
-        if title:
-            payload = f"Заголовок: {title}\nТекст: {text}"
-        else:
-            payload = f"Текст: {text}"
-        passages.append(PASSAGE_PREFIX + payload)
-    return passages
+    return [
+        _passage_text(getattr(row, "title", ""), getattr(row, "text", ""))
+        for row in df.itertuples(index=False)
+    ]
 
 
 def embed_passages(model: SentenceTransformer, passages: List[str]) -> np.ndarray:
@@ -219,13 +328,109 @@ def embed_passages(model: SentenceTransformer, passages: List[str]) -> np.ndarra
     ).astype(np.float32)
 
 
-def embed_query(model: SentenceTransformer, query: str) -> np.ndarray:
+def _rebuild_embeddings(
+    model: Optional[SentenceTransformer],
+    csv_path: str,
+    df: pd.DataFrame,
+    workers: Optional[int] = None,
+    shard_size: int = rebuild_index.EMBED_SHARD_SIZE,
+    progress: Optional[rebuild_index.ProgressCallback] = None,
+    reuse_cached: bool = True,
+) -> np.ndarray:
+    cache_path = _index_cache_path(csv_path)
+    with rebuild_index.rebuild_lock(cache_path):
+        # Another process may have finished the same rebuild while we waited.
+        cached = _load_cached_embeddings(csv_path, df) if reuse_cached else None
+        if cached is not None:
+            return cached
+
+        checkpoints = rebuild_index.checkpoint_dir(cache_path, _docs_signature(df))
+        passage_embs = rebuild_index.build_embeddings(
+            _build_passages(df),
+            checkpoints,
+            model_name=MODEL_NAME,
+            model=model,
+            workers=workers,
+            shard_size=shard_size,
+            progress=progress,
+        )
+        _save_cached_embeddings(csv_path, df, passage_embs)
+        rebuild_index.clear_checkpoints(checkpoints)
+    return passage_embs
+
+
+def _embed_with_cache(
+    model: SentenceTransformer,
+    csv_path: str,
+    df: pd.DataFrame,
+    progress: Optional[rebuild_index.ProgressCallback] = None,
+) -> np.ndarray:
+    cached = _load_cached_embeddings(csv_path, df)
+    if cached is None:
+        with rebuild_index.rebuild_lock(_index_cache_path(csv_path)):
+            # Another process may have refreshed the cache while we waited.
+            cached = _load_cached_embeddings(csv_path, df)
+            if cached is None:
+                cached = _embed_missing_passages(model, csv_path, df, progress)
+    if cached is None:
+        return _rebuild_embeddings(model, csv_path, df, progress=progress)
+    if progress is not None:
+        progress(len(cached), len(cached))
+    return cached
+
+
+def _embed_missing_passages(
+    model: SentenceTransformer,
+    csv_path: str,
+    df: pd.DataFrame,
+    progress: Optional[rebuild_index.ProgressCallback] = None,
+) -> Optional[np.ndarray]:
+    # Chunks whose passage text is unchanged keep their cached vectors, so a
+    # restart after a few admin writes only encodes the edited documents.
+    # None when nothing is reusable and a full rebuild is needed instead.
+    passages = _build_passages(df)
+    keys = _passage_keys(passages)
+    positions, reusable = _load_reusable_embeddings(csv_path)
+    missing = [index for index, key in enumerate(keys) if str(key) not in positions]
+    if reusable is None or len(missing) == len(passages):
+        return None
+
+    passage_embs = np.zeros((len(passages), reusable.shape[1]), dtype=np.float32)
+    for index, key in enumerate(keys):
+        position = positions.get(str(key))
+        if position is not None:
+            passage_embs[index] = reusable[position]
+    step = rebuild_index.EMBED_SHARD_SIZE
+    for start in range(0, len(missing), step):
+        batch = missing[start : start + step]
+        passage_embs[batch] = embed_passages(model, [passages[index] for index in batch])
+        if progress is not None:
+            progress(start + len(batch), len(missing))
+
+    _save_cached_embeddings(csv_path, df, passage_embs)
+    return passage_embs
+
+
+def rebuild_embeddings_cache(
+    workers: Optional[int] = None,
+    shard_size: int = rebuild_index.EMBED_SHARD_SIZE,
+    force: bool = False,
+) -> int:
+    df, csv_path = _load_docs_state()
+    df = _partition_for_shard(df)
+    if not force and _load_cached_embeddings(csv_path, df) is not None:
+        return len(df)
+    _rebuild_embeddings(None, csv_path, df, workers=workers, shard_size=shard_size, reuse_cached=not force)
+    return len(df)
+
+
+def embed_query(model: SentenceTransformer, query: str, wrap_weight: float = QUERY_WRAP_WEIGHT) -> np.ndarray:
     clean_query = normalize_text(query)
     raw_query = QUERY_PREFIX + clean_query
     wrapped_query = QUERY_PREFIX + wrap_query(clean_query)
 
     # Short queries work better without heavy prompt wrapping.
-    if len(clean_query.split()) <= 2:
+    if len(clean_query.split()) <= 2 or wrap_weight <= 0:
         return model.encode(
             [raw_query],
             convert_to_numpy=True,
@@ -239,7 +444,7 @@ def embed_query(model: SentenceTransformer, query: str) -> np.ndarray:
         normalize_embeddings=True,
         show_progress_bar=False,
     ).astype(np.float32)
-    mixed = (0.75 * vectors[0]) + (0.25 * vectors[1])
+    mixed = ((1.0 - wrap_weight) * vectors[0]) + (wrap_weight * vectors[1])
     norm = np.linalg.norm(mixed)
     if norm > 0:
         mixed = mixed / norm
@@ -276,85 +481,457 @@ def _lexical_bonus(query_terms: List[str], title: str, text: str) -> float:
     return min(bonus, 0.30)
 
 
-def search(
+def rank_chunks(
     query: str,
     model: SentenceTransformer,
     df: pd.DataFrame,
     passage_embs: np.ndarray,
+    params: SearchParams = DEFAULT_PARAMS,
 ) -> List[Dict[str, Any]]:
     clean_query = query.strip()
     if not clean_query:
         return []
 
-    q_emb = embed_query(model, clean_query)
+    # Match the matrix dtype so a float16 index is not upcast whole per query.
+    q_emb = embed_query(model, clean_query, wrap_weight=params.wrap_weight).astype(passage_embs.dtype, copy=False)
     sims = passage_embs @ q_emb
     if sims.size == 0:
         return []
 
-    top_idx = np.argsort(-sims)[: min(TOP_CHUNKS, sims.size)]
-    query_terms = _query_terms(clean_query)
+    top_idx = np.argsort(-sims)[: min(params.top_chunks, sims.size)]
+    query_terms = _query_terms(clean_query) if params.lexical_bonus else []
 
-    ranked: List[tuple[float, float, int]] = []
+    ranked: List[Dict[str, Any]] = []
     for idx in top_idx:
         semantic_score = float(sims[int(idx)])
-        if semantic_score < MIN_SCORE:
+        if semantic_score < params.min_score:
             continue
         row = df.iloc[int(idx)]
         title = _safe_str(row.get("title", ""))
         text = _safe_str(row.get("text", ""))
-        score = semantic_score + _lexical_bonus(query_terms, title, text)
-        ranked.append((score, semantic_score, int(idx)))
+        ranked.append(
+            {
+                "rank_score": semantic_score + _lexical_bonus(query_terms, title, text),
+                "row": int(idx),
+                "score": semantic_score,
+                "doc_id": _safe_str(row.get("doc_id", "")),
+                "chunk_id": _safe_str(row.get("chunk_id", "")),
+                "title": title,
+                "text": text,
+            }
+        )
 
-    ranked.sort(key=lambda item: item[0], reverse=True)
+    ranked.sort(key=lambda hit: hit["rank_score"], reverse=True)
+    return ranked
 
+
+def select_results(ranked: List[Dict[str, Any]], params: SearchParams = DEFAULT_PARAMS) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
     per_doc_count: Dict[str, int] = {}
-    for score, semantic_score, idx in ranked:
-        row = df.iloc[idx]
-        doc_id = _safe_str(row.get("doc_id", ""))
-        if per_doc_count.get(doc_id, 0) >= MAX_CHUNKS_PER_DOC:
+    for hit in ranked:
+        doc_id = str(hit.get("doc_id", ""))
+        if per_doc_count.get(doc_id, 0) >= params.max_chunks_per_doc:
             continue
 
-        results.append(
-            {
-                "score": semantic_score,
-                "doc_id": doc_id,
-                "chunk_id": _safe_str(row.get("chunk_id", "")),
-                "title": _safe_str(row.get("title", "")),
-                "text": _safe_str(row.get("text", "")),
-            }
-        )
+        results.append(hit)
         per_doc_count[doc_id] = per_doc_count.get(doc_id, 0) + 1
-        if len(results) >= TOP_RESULTS:
+        if len(results) >= params.top_results:
             break
 
     return results
 
 
+def public_result(hit: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    if fields is None:
+        return {key: value for key, value in hit.items() if key not in _INTERNAL_HIT_KEYS}
+    return {key: hit[key] for key in fields if key in hit}
+
+
+def validate_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    unknown = [name for name in fields if name not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown result fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def _sentence_offsets(text: str) -> np.ndarray:
+    spans: List[tuple[int, int]] = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        if text[start : match.end()].strip():
+            spans.append((start, match.end()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return np.asarray(spans, dtype=np.int32).reshape(-1, 2)
+
+
+def build_snippet(
+    text: str,
+    offsets: np.ndarray,
+    query_terms: List[str],
+    max_chars: int = SNIPPET_CHARS,
+) -> str:
+    if len(text) <= max_chars:
+        return text
+    if offsets.size == 0:
+        offsets = np.asarray([[0, len(text)]], dtype=np.int32)
+
+    best, best_hits = 0, 0
+    for position, (start, end) in enumerate(offsets):
+        sentence = text[start:end].lower()
+        hits = sum(1 for term in query_terms if term in sentence)
+        if hits > best_hits:
+            best, best_hits = position, hits
+
+    start, end = int(offsets[best][0]), int(offsets[best][1])
+    following = best + 1
+    while following < len(offsets) and int(offsets[following][1]) - start <= max_chars:
+        end = int(offsets[following][1])
+        following += 1
+
+    if end - start > max_chars:
+        # A single long sentence: keep the window around the first matched term.
+        lowered = text[start:end].lower()
+        anchor = start
+        for term in query_terms:
+            position = lowered.find(term)
+            if position >= 0:
+                anchor = start + position
+                break
+        start = max(start, anchor - max_chars // 4)
+        end = min(len(text), start + max_chars)
+
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = f"…{snippet}"
+    if end < len(text):
+        snippet = f"{snippet}…"
+    return snippet
+
+
+def _add_snippets(hits: List[Dict[str, Any]], query: str, state: SearchState) -> None:
+    query_terms = _query_terms(query.strip())
+    for hit in hits:
+        hit["snippet"] = build_snippet(hit["text"], state.sentence_offsets[hit["row"]], query_terms)
+
+
+def search(
+    query: str,
+    model: SentenceTransformer,
+    df: pd.DataFrame,
+    passage_embs: np.ndarray,
+) -> List[Dict[str, Any]]:
+    return [public_result(hit) for hit in select_results(rank_chunks(query, model, df, passage_embs))]
+
+
+def documents_only() -> bool:
+    return SERVE_MODE == "documents"
+
+
+def init_documents() -> None:
+    # Warmup for SERVE_MODE=documents: seed the database and build the
+    # suggestion index, without touching the model.
+    warmup.begin(warmup.LOADING_DOCS)
+    try:
+        if db.is_enabled():
+            _ensure_db_seeded()
+        _suggestion_index()
+    except Exception as exc:
+        warmup.fail(exc)
+        raise
+    warmup.finish()
+
+
+def load_model() -> SentenceTransformer:
+    if documents_only():
+        raise RuntimeError("The search model is not loaded in SERVE_MODE=documents")
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(MODEL_NAME)
+
+
 def init_search(force: bool = False) -> SearchState:
-    global _STATE
-    if _STATE is not None and not force:
-        return _STATE
+    state = _STATE
+    if state is not None and not force:
+        return state
+
+    with _INIT_LOCK:
+        # Whoever waited on the lock reuses the state the previous holder built.
+        if _STATE is not None and (not force or _STATE is not state):
+            return _STATE
+        try:
+            return _load_search_state()
+        except Exception as exc:
+            warmup.fail(exc)
+            raise
 
-    df, csv_path = _load_docs_state()
-    model = _STATE.model if (_STATE is not None and force) else SentenceTransformer(MODEL_NAME)
 
-    passage_embs = _load_cached_embeddings(csv_path, df)
-    if passage_embs is None:
-        passages = _build_passages(df)
-        passage_embs = embed_passages(model, passages)
-        _save_cached_embeddings(csv_path, df, passage_embs)
+def _load_search_state() -> SearchState:
+    global _STATE, _SUGGESTIONS
+    previous = _STATE
 
-    _STATE = SearchState(model=model, df=df, passage_embs=passage_embs, csv_path=csv_path)
+    # Read the change seq before the documents so nothing committed in between
+    # is missed; replaying an already-loaded change is harmless.
+    warmup.begin(warmup.LOADING_DOCS)
+    change_seq = db.latest_change_seq() if db.is_enabled() else 0
+    df, csv_path = _load_docs_state()
+    df = _partition_for_shard(df)
+
+    warmup.begin(warmup.LOADING_MODEL)
+    model = previous.model if previous is not None else load_model()
+
+    warmup.begin(warmup.EMBEDDING, total=len(df))
+    passage_embs = _embed_with_cache(model, csv_path, df, progress=warmup.progress)
+
+    warmup.begin(warmup.INDEXING)
+    sentence_offsets = [_sentence_offsets(text) for text in df["text"].astype(str).tolist()]
+    _STATE = SearchState(
+        model=model,
+        df=df,
+        passage_embs=passage_embs,
+        csv_path=csv_path,
+        sentence_offsets=sentence_offsets,
+        signature=_docs_signature(df),
+        change_seq=change_seq,
+    )
+    # Rebuilt lazily from the fresh corpus on the next lookup.
+    _SUGGESTIONS = None
+    warmup.finish()
     return _STATE
 
 
-def search_core(query: str, state: Optional[SearchState] = None) -> List[Dict[str, Any]]:
+def _apply_doc_delta(
+    state: SearchState,
+    fresh_rows: pd.DataFrame,
+    changed_doc_ids: List[str],
+    change_seq: int,
+) -> SearchState:
+    fresh = _partition_for_shard(_ensure_admin_columns(fresh_rows))
+    changed = {str(doc_id) for doc_id in changed_doc_ids}
+    keep = (~state.df["doc_id"].astype(str).isin(changed)).to_numpy()
+
+    kept_embs = state.passage_embs[keep]
+    if len(fresh):
+        fresh_embs = embed_passages(state.model, _build_passages(fresh))
+        passage_embs = np.concatenate([kept_embs, fresh_embs], axis=0) if len(kept_embs) else fresh_embs
+    else:
+        passage_embs = kept_embs
+
+    df = pd.concat([state.df[keep], fresh], ignore_index=True)
+    sentence_offsets = [offsets for offsets, kept in zip(state.sentence_offsets, keep) if kept]
+    sentence_offsets.extend(_sentence_offsets(text) for text in fresh["text"].astype(str).tolist())
+
+    # Same row order as a fresh load, so replicas agree on the signature.
+    order = df.sort_values(by=["doc_id", "chunk_id"], kind="stable").index.to_numpy()
+    df = df.loc[order].reset_index(drop=True)
+
+    return SearchState(
+        model=state.model,
+        df=df,
+        passage_embs=passage_embs[order],
+        csv_path=state.csv_path,
+        sentence_offsets=[sentence_offsets[int(position)] for position in order],
+        signature=_docs_signature(df),
+        change_seq=change_seq,
+    )
+
+
+def _reload_after_reset() -> None:
+    global _RESET_RELOADING
+    try:
+        init_search(force=True)
+    except Exception:
+        logger.exception("Full index reload after a corpus reset failed")
+    finally:
+        with _INDEX_LOCK:
+            _RESET_RELOADING = False
+
+
+def sync_changes() -> int:
+    global _STATE, _SUGGESTIONS, _RESET_RELOADING, _SUGGESTIONS_SEQ
+    if not db.is_enabled():
+        return 0
+
+    with _INDEX_LOCK:
+        state = _STATE
+        suggestions = _SUGGESTIONS
+        suggestions_seq = _SUGGESTIONS_SEQ
+        seqs = []
+        if state is not None:
+            seqs.append(state.change_seq)
+        if suggestions is not None:
+            seqs.append(suggestions_seq)
+        if not seqs:
+            return 0
+
+        changes = db.fetch_changes_since(min(seqs))
+        if not changes:
+            return 0
+
+        last_seq = changes[-1][0]
+        state_changes = [change for change in changes if state is not None and change[0] > state.change_seq]
+        suggestion_changes = [change for change in changes if suggestions is not None and change[0] > suggestions_seq]
+
+        if any(op == "reset" for _, _, op in suggestion_changes) and _SUGGESTIONS is suggestions:
+            # Rebuilt from the whole corpus on the next lookup.
+            _SUGGESTIONS = None
+            suggestion_changes = []
+
+        reset = any(op == "reset" for _, _, op in state_changes)
+        if reset:
+            # A full reload re-embeds the corpus; run it in the background so
+            # neither the lock nor the caller (often the writer thread) waits on it.
+            if not _RESET_RELOADING:
+                _RESET_RELOADING = True
+                threading.Thread(target=_reload_after_reset, name="search-reset-reload", daemon=True).start()
+            state_changes = []
+
+        doc_ids = sorted({doc_id for _, doc_id, _ in state_changes + suggestion_changes})
+        fresh = _ensure_admin_columns(db.load_docs_df(doc_ids)) if doc_ids else None
+        if state_changes:
+            state_doc_ids = sorted({doc_id for _, doc_id, _ in state_changes})
+            updated = _apply_doc_delta(state, fresh[fresh["doc_id"].isin(state_doc_ids)], state_doc_ids, last_seq)
+            if _STATE is state:
+                _STATE = updated
+        if suggestion_changes and _SUGGESTIONS is suggestions:
+            suggestion_doc_ids = sorted({doc_id for _, doc_id, _ in suggestion_changes})
+            suggestions.apply_delta(
+                _suggestion_documents(fresh[fresh["doc_id"].isin(suggestion_doc_ids)]), suggestion_doc_ids
+            )
+            _SUGGESTIONS_SEQ = last_seq
+        return len(changes)
+
+
+def _suggestion_documents(df: pd.DataFrame) -> List[suggest.DocumentText]:
+    return [
+        (str(row.doc_id), str(row.title), str(row.text))
+        for row in df[["doc_id", "title", "text"]].itertuples(index=False)
+    ]
+
+
+def _suggestion_index() -> suggest.SuggestIndex:
+    global _SUGGESTIONS, _SUGGESTIONS_SEQ
+    index = _SUGGESTIONS
+    if index is None:
+        # Shards only hold their partition, so they read the whole corpus instead.
+        state = _STATE
+        if state is not None and SHARD_COUNT <= 1:
+            df, seq = state.df, state.change_seq
+        else:
+            # Seq before documents, as in _load_search_state.
+            seq = db.latest_change_seq() if db.is_enabled() else 0
+            df = _load_docs_state()[0]
+        index = suggest.SuggestIndex.from_documents(_suggestion_documents(df))
+        with _INDEX_LOCK:
+            _SUGGESTIONS_SEQ = seq
+            _SUGGESTIONS = index
+    return index
+
+
+def _refresh_suggestions(fresh_rows: pd.DataFrame, changed_doc_ids: List[str]) -> None:
+    index = _SUGGESTIONS
+    if index is not None:
+        index.apply_delta(_suggestion_documents(fresh_rows), changed_doc_ids)
+
+
+def suggest_core(prefix: str, limit: int = suggest.SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+    return _suggestion_index().lookup(prefix, limit)
+
+
+def _strong_etag(kind: str, parts: List[str]) -> str:
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f'"{kind}-{digest[:32]}"'
+
+
+def document_etag(doc: Dict[str, Any]) -> str:
+    return _strong_etag(
+        "doc",
+        [str(doc.get(key, "")) for key in ("doc_id", "title", "text", "created_at", "updated_at")],
+    )
+
+
+def search_etag(
+    state: SearchState,
+    query: str,
+    fields: Optional[List[str]] = None,
+    snippet: bool = False,
+) -> str:
+    # The corpus signature changes on every admin write, so a matching tag can
+    # never point at results computed from an older index.
+    settings = f"{MODEL_NAME}|{DEFAULT_PARAMS}|{SNIPPET_CHARS}"
+    return _strong_etag(
+        "search",
+        [
+            state.signature,
+            settings,
+            query,
+            ",".join(fields) if fields is not None else "*",
+            "snippet" if snippet else "",
+        ],
+    )
+
+
+def search_core(
+    query: str,
+    state: Optional[SearchState] = None,
+    fields: Optional[List[str]] = None,
+    snippet: bool = False,
+) -> List[Dict[str, Any]]:
     resolved_state = state or init_search()
-    return search(query, resolved_state.model, resolved_state.df, resolved_state.passage_embs)
+    if fields is None and not snippet:
+        return search(query, resolved_state.model, resolved_state.df, resolved_state.passage_embs)
+
+    ranked = rank_chunks(query, resolved_state.model, resolved_state.df, resolved_state.passage_embs)
+    hits = select_results(ranked)
+    if snippet:
+        _add_snippets(hits, query, resolved_state)
+    return [public_result(hit, fields) for hit in hits]
 
 
-def _split_text_to_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> List[str]:
+def shard_search_core(
+    query: str,
+    state: Optional[SearchState] = None,
+    fields: Optional[List[str]] = None,
+    snippet: bool = False,
+) -> List[Dict[str, Any]]:
+    # Every chunk of a document lives on the same shard, so capping per shard
+    # keeps enough candidates for the coordinator to redo the global cut.
+    resolved_state = state or init_search()
+    ranked = rank_chunks(query, resolved_state.model, resolved_state.df, resolved_state.passage_embs)
+    hits = select_results(ranked)
+    if snippet:
+        _add_snippets(hits, query, resolved_state)
+    if fields is None:
+        return hits
+    # The coordinator still needs the merge keys, whatever the client projected.
+    shard_fields = list(dict.fromkeys(["rank_score", "doc_id", *fields]))
+    return [{key: hit[key] for key in shard_fields if key in hit} for hit in hits]
+
+
+def _split_text_to_chunks(text: str, chunk_size: int = CHUNK_SIZE, title: str = "") -> List[Tuple[str, int]]:
+    # (chunk, overlap_chars) pairs; see chunking.pack_sentences.
+    if chunking.CHUNK_MODE == "tokens":
+        header = _passage_text(title, "")
+        try:
+            packed = chunking.split_by_tokens(text, MODEL_NAME, passage_header=header)
+        except (ImportError, OSError) as exc:
+            # Falling back to characters would silently store differently split
+            # chunks than the other replicas write.
+            raise RuntimeError(
+                f"Tokenizer for {MODEL_NAME} is unavailable ({exc}); set CHUNK_MODE=chars to chunk by characters"
+            ) from exc
+        if packed:
+            budget = chunking.text_token_budget(chunking.load_tokenizer(MODEL_NAME), header)
+            logger.info("Chunked text: %s", chunking.token_stats([count for _, count, _ in packed], budget))
+        return [(chunk, overlap_chars) for chunk, _, overlap_chars in packed]
+
+    return [(chunk, 0) for chunk in _split_text_to_chunks_by_chars(text, chunk_size)]
+
+
+def _split_text_to_chunks_by_chars(text: str, chunk_size: int = CHUNK_SIZE) -> List[str]:
     normalized = str(text).replace("\r\n", "\n").strip()
     if not normalized:
         return []
@@ -390,14 +967,14 @@ def _split_text_to_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> List[str]:
     return chunks
 
 
-def _next_doc_id(df: pd.DataFrame) -> str:
+def _max_doc_number(df: pd.DataFrame) -> int:
     pattern = re.compile(r"^DOC(\d+)$")
     max_num = 0
     for raw in df.get("doc_id", pd.Series(dtype=str)).astype(str):
         match = pattern.match(raw.strip())
         if match:
             max_num = max(max_num, int(match.group(1)))
-    return f"DOC{max_num + 1:04d}"
+    return max_num
 
 
 def _collect_full_text(rows: pd.DataFrame) -> str:
@@ -412,7 +989,12 @@ def _collect_full_text(rows: pd.DataFrame) -> str:
         )
         ordered = ordered.sort_values(by=["_chunk_order", "chunk_id"], kind="stable")
 
-    parts = [normalize_text(text) for text in ordered["text"].astype(str).tolist() if normalize_text(text)]
+    overlaps = ordered["overlap_chars"] if "overlap_chars" in ordered.columns else pd.Series(0, index=ordered.index)
+    parts: List[str] = []
+    for text, overlap_chars in zip(ordered["text"].astype(str).tolist(), overlaps.tolist()):
+        part = chunking.strip_overlap(normalize_text(text), int(overlap_chars or 0))
+        if part:
+            parts.append(part)
     return "\n\n".join(parts)
 
 
@@ -451,24 +1033,14 @@ def _list_documents_from_df(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return documents
 
 
-def _persist_docs(df: pd.DataFrame, csv_path: str) -> None:
-    global _STATE
-
-    cleaned = _ensure_admin_columns(df)
-    cache_path = Path(_index_cache_path(csv_path))
-    if cache_path.exists():
-        cache_path.unlink()
-
-    if db.is_enabled():
-        db.save_docs_df(cleaned)
-    else:
-        cleaned.to_csv(csv_path, index=False, encoding="utf-8")
-
-    _STATE = None
-
-
 def get_document_core(doc_id: str, state: Optional[SearchState] = None) -> Optional[Dict[str, Any]]:
-    df = _ensure_admin_columns(state.df.copy()) if state is not None else _load_docs_state()[0]
+    if state is not None:
+        df = _ensure_admin_columns(state.df.copy())
+    elif db.is_enabled():
+        # Load just the requested document's rows instead of the whole corpus.
+        df = _ensure_admin_columns(db.load_docs_df([str(doc_id).strip()]))
+    else:
+        df = _load_docs_state()[0]
     return _document_from_df(doc_id, df)
 
 
@@ -477,129 +1049,294 @@ def list_documents_core(state: Optional[SearchState] = None) -> List[Dict[str, A
     return _list_documents_from_df(df)
 
 
-def create_document_core(
-    title: str,
-    text: str,
-    department: str = "general",
-    access_level: str = "internal",
-    state: Optional[SearchState] = None,
-) -> Dict[str, Any]:
-    if state is None:
-        df, csv_path = _load_docs_state()
-    else:
-        df = _ensure_admin_columns(state.df.copy())
-        csv_path = state.csv_path
+@dataclass
+class DocumentWrite:
+    op: str
+    doc_id: str = ""
+    title: str = ""
+    text: str = ""
+    department: Optional[str] = None
+    access_level: Optional[str] = None
 
-    clean_title = normalize_text(title)
-    if len(clean_title) < 3:
-        raise ValueError("Title must be at least 3 characters long.")
 
-    chunks = _split_text_to_chunks(text)
-    if not chunks:
-        raise ValueError("Document content is empty.")
+_WRITE_LOCK = threading.Lock()
 
-    doc_id = _next_doc_id(df)
-    today = _today_iso()
 
+def _document_rows(
+    doc_id: str,
+    title: str,
+    chunks: List[Tuple[str, int]],
+    department: str,
+    access_level: str,
+    created_at: str,
+    updated_at: str,
+) -> pd.DataFrame:
     rows = []
-    for index, chunk in enumerate(chunks, start=1):
+    for index, (chunk, overlap_chars) in enumerate(chunks, start=1):
         rows.append(
             {
                 "doc_id": doc_id,
                 "chunk_id": f"{doc_id}_C{index:02d}",
-                "title": clean_title,
+                "title": title,
                 "department": department,
                 "access_level": access_level,
                 "text": chunk,
-                "created_at": today,
-                "updated_at": today,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "overlap_chars": overlap_chars,
             }
         )
+    return _ensure_admin_columns(pd.DataFrame(rows))
+
+
+def _rows_by_doc(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    return {str(doc_id): rows for doc_id, rows in df.groupby(df["doc_id"].astype(str), sort=False)}
+
+
+class _WriteBatch:
+    # Applies a burst of mutations to the rows of the documents they touch,
+    # so persistence and index refresh only see per-document deltas.
+
+    def __init__(self, current_rows: Dict[str, pd.DataFrame], max_doc_number: int):
+        self.rows: Dict[str, Optional[pd.DataFrame]] = dict(current_rows)
+        self.existing = set(current_rows)
+        self.next_number = max_doc_number + 1
+        self.changed: List[str] = []
+
+    def _set(self, doc_id: str, rows: Optional[pd.DataFrame]) -> None:
+        self.rows[doc_id] = rows
+        if doc_id not in self.changed:
+            self.changed.append(doc_id)
+
+    def upserts(self) -> Dict[str, pd.DataFrame]:
+        return {doc_id: self.rows[doc_id] for doc_id in self.changed if self.rows[doc_id] is not None}
+
+    def deletes(self) -> List[str]:
+        return [doc_id for doc_id in self.changed if self.rows[doc_id] is None and doc_id in self.existing]
+
+    def apply(self, write: DocumentWrite) -> Any:
+        if write.op == "create":
+            return self._create(write)
+        if write.op == "update":
+            return self._update(write)
+        if write.op == "delete":
+            return self._delete(write)
+        if write.op == "rechunk":
+            return self._rechunk(write)
+        raise ValueError(f"Unknown document write: {write.op}")
+
+    def _create(self, write: DocumentWrite) -> Dict[str, Any]:
+        clean_title = normalize_text(write.title)
+        if len(clean_title) < 3:
+            raise ValueError("Title must be at least 3 characters long.")
+
+        chunks = _split_text_to_chunks(write.text, title=clean_title)
+        if not chunks:
+            raise ValueError("Document content is empty.")
+
+        doc_id = f"DOC{self.next_number:04d}"
+        self.next_number += 1
+        today = _today_iso()
+        rows = _document_rows(
+            doc_id,
+            clean_title,
+            chunks,
+            write.department or "general",
+            write.access_level or "internal",
+            today,
+            today,
+        )
+        self._set(doc_id, rows)
+
+        doc = _document_from_df(doc_id, rows)
+        if doc is None:
+            raise RuntimeError("Failed to load created document.")
+        return doc
+
+    def _update(self, write: DocumentWrite) -> Optional[Dict[str, Any]]:
+        target = str(write.doc_id).strip()
+        if not target:
+            return None
+
+        clean_title = normalize_text(write.title)
+        if len(clean_title) < 3:
+            raise ValueError("Title must be at least 3 characters long.")
+
+        chunks = _split_text_to_chunks(write.text, title=clean_title)
+        if not chunks:
+            raise ValueError("Document content is empty.")
+
+        current = self.rows.get(target)
+        if current is None or current.empty:
+            return None
+
+        existing = current.iloc[0]
+        rows = _document_rows(
+            target,
+            clean_title,
+            chunks,
+            write.department or _safe_str(existing.get("department", "")) or "general",
+            write.access_level or _safe_str(existing.get("access_level", "")) or "internal",
+            _safe_str(existing.get("created_at", "")) or _today_iso(),
+            _today_iso(),
+        )
+        self._set(target, rows)
+        return _document_from_df(target, rows)
+
+    def _rechunk(self, write: DocumentWrite) -> bool:
+        # Re-splits the stored text with the current chunking settings; the
+        # document itself, including updated_at, stays as it was.
+        target = str(write.doc_id).strip()
+        current = self.rows.get(target) if target else None
+        if current is None or current.empty:
+            return False
+
+        existing = current.iloc[0]
+        title = normalize_text(existing.get("title", ""))
+        chunks = _split_text_to_chunks(_collect_full_text(current), title=title)
+        if not chunks:
+            return False
+        rows = _document_rows(
+            target,
+            title,
+            chunks,
+            _safe_str(existing.get("department", "")) or "general",
+            _safe_str(existing.get("access_level", "")) or "internal",
+            _safe_str(existing.get("created_at", "")) or _today_iso(),
+            _safe_str(existing.get("updated_at", "")) or _today_iso(),
+        )
+        before = _ensure_admin_columns(current).sort_values("chunk_id", kind="stable")
+        if before[["text", "overlap_chars"]].values.tolist() == rows[["text", "overlap_chars"]].values.tolist():
+            return False
+        self._set(target, rows)
+        return True
+
+    def _delete(self, write: DocumentWrite) -> bool:
+        target = str(write.doc_id).strip()
+        if not target or self.rows.get(target) is None:
+            return False
+        self._set(target, None)
+        return True
+
+
+def _run_writes(batch: _WriteBatch, writes: List[DocumentWrite]) -> List[Any]:
+    results: List[Any] = []
+    for write in writes:
+        # A failing write only fails its own caller; the rest of the batch commits.
+        try:
+            results.append(batch.apply(write))
+        except ValueError as exc:
+            results.append(exc)
+        except Exception as exc:
+            logger.exception("Document write %s %s failed", write.op, write.doc_id or "(new)")
+            results.append(exc)
+    return results
 
-    updated_df = pd.concat([df, pd.DataFrame(rows)], ignore_index=True)
-    _persist_docs(updated_df, csv_path)
 
-    doc = _document_from_df(doc_id, updated_df)
-    if doc is None:
-        raise RuntimeError("Failed to load created document.")
-    return doc
+def _write_targets(writes: List[DocumentWrite]) -> List[str]:
+    return sorted({str(write.doc_id).strip() for write in writes if write.op != "create"} - {""})
 
 
-def update_document_core(
-    doc_id: str,
-    title: str,
-    text: str,
-    department: Optional[str] = None,
-    access_level: Optional[str] = None,
-    state: Optional[SearchState] = None,
-) -> Optional[Dict[str, Any]]:
-    target = str(doc_id).strip()
-    if not target:
-        return None
+def _apply_db_writes(writes: List[DocumentWrite]) -> List[Any]:
+    _ensure_db_seeded()
+    with db.write_transaction() as cur:
+        current = _ensure_admin_columns(db.load_doc_rows(cur, _write_targets(writes)))
+        batch = _WriteBatch(_rows_by_doc(current), db.max_doc_number(cur))
+        results = _run_writes(batch, writes)
+        if batch.changed:
+            db.write_document_changes(cur, batch.upserts(), batch.deletes())
 
-    if state is None:
-        df, csv_path = _load_docs_state()
-    else:
-        df = _ensure_admin_columns(state.df.copy())
-        csv_path = state.csv_path
+    if batch.changed:
+        # Committed already: a failed refresh must not fail the writes, and the
+        # change feed retries it from the index's own seq.
+        try:
+            sync_changes()
+        except Exception:
+            logger.exception("Index refresh after document writes failed; the change feed will catch up")
+    return results
 
-    clean_title = normalize_text(title)
-    if len(clean_title) < 3:
-        raise ValueError("Title must be at least 3 characters long.")
 
-    chunks = _split_text_to_chunks(text)
-    if not chunks:
-        raise ValueError("Document content is empty.")
+def _apply_csv_writes(writes: List[DocumentWrite]) -> List[Any]:
+    global _STATE, _SUGGESTIONS
 
-    mask = df["doc_id"].astype(str) == target
-    if not mask.any():
-        return None
+    df, csv_path = _load_docs_state()
+    targets = df["doc_id"].astype(str).isin(_write_targets(writes))
+    batch = _WriteBatch(_rows_by_doc(df[targets]), _max_doc_number(df))
+    results = _run_writes(batch, writes)
+    if not batch.changed:
+        return results
+
+    kept = df[~df["doc_id"].astype(str).isin(batch.changed)]
+    updated = _ensure_admin_columns(pd.concat([kept, *batch.upserts().values()], ignore_index=True))
+    updated.to_csv(csv_path, index=False, encoding="utf-8")
+
+    fresh = updated[updated["doc_id"].astype(str).isin(batch.changed)]
+    with _INDEX_LOCK:
+        state = _STATE
+        try:
+            if state is not None and state.csv_path == csv_path:
+                _STATE = _apply_doc_delta(state, fresh, batch.changed, state.change_seq)
+            else:
+                _STATE = None
+            _refresh_suggestions(fresh, batch.changed)
+        except Exception:
+            # The CSV is written already; drop the stale indexes so the next
+            # request rebuilds them from it instead of failing the writes.
+            logger.exception("Index refresh after document writes failed; rebuilding on next use")
+            _STATE = None
+            _SUGGESTIONS = None
+    return results
 
-    existing = df[mask].iloc[0]
-    resolved_department = department or _safe_str(existing.get("department", "")) or "general"
-    resolved_access = access_level or _safe_str(existing.get("access_level", "")) or "internal"
-    created_at = _safe_str(existing.get("created_at", "")) or _today_iso()
-    updated_at = _today_iso()
 
-    kept = df[~mask].copy()
-    rows = []
-    for index, chunk in enumerate(chunks, start=1):
-        rows.append(
-            {
-                "doc_id": target,
-                "chunk_id": f"{target}_C{index:02d}",
-                "title": clean_title,
-                "department": resolved_department,
-                "access_level": resolved_access,
-                "text": chunk,
-                "created_at": created_at,
-                "updated_at": updated_at,
-            }
-        )
+def apply_write_batch(writes: List[DocumentWrite]) -> List[Any]:
+    # One persistence step and one index refresh for the whole batch; results
+    # hold the exception in place of writes that failed on their own, while a
+    # persistence failure raises and fails the whole batch.
+    with _WRITE_LOCK:
+        if db.is_enabled():
+            return _apply_db_writes(writes)
+        return _apply_csv_writes(writes)
 
-    updated_df = pd.concat([kept, pd.DataFrame(rows)], ignore_index=True)
-    _persist_docs(updated_df, csv_path)
-    return _document_from_df(target, updated_df)
 
+def _apply_single_write(write: DocumentWrite) -> Any:
+    result = apply_write_batch([write])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
 
-def delete_document_core(doc_id: str, state: Optional[SearchState] = None) -> bool:
-    target = str(doc_id).strip()
-    if not target:
-        return False
 
-    if state is None:
-        df, csv_path = _load_docs_state()
-    else:
-        df = _ensure_admin_columns(state.df.copy())
-        csv_path = state.csv_path
+def create_document_core(
+    title: str,
+    text: str,
+    department: str = "general",
+    access_level: str = "internal",
+) -> Dict[str, Any]:
+    return _apply_single_write(
+        DocumentWrite(op="create", title=title, text=text, department=department, access_level=access_level)
+    )
+
+
+def update_document_core(
+    doc_id: str,
+    title: str,
+    text: str,
+    department: Optional[str] = None,
+    access_level: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    return _apply_single_write(
+        DocumentWrite(
+            op="update",
+            doc_id=doc_id,
+            title=title,
+            text=text,
+            department=department,
+            access_level=access_level,
+        )
+    )
 
-    mask = df["doc_id"].astype(str) == target
-    if not mask.any():
-        return False
 
-    updated_df = df[~mask].copy()
-    _persist_docs(updated_df, csv_path)
-    return True
+def delete_document_core(doc_id: str) -> bool:
+    return _apply_single_write(DocumentWrite(op="delete", doc_id=doc_id))
 
 
 def main() -> None:
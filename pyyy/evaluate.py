@@ -0,0 +1,241 @@
+import argparse
+import dataclasses
+import json
+import math
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+import e5_search
+from e5_search import SearchParams, SearchState
+
+
+DEFAULT_QUERIES = "data/eval_queries.jsonl"
+DEFAULT_K = (1, 3, 10)
+EMBEDDING_DTYPES = ("float32", "float16")
+
+LabeledQuery = Tuple[str, List[str]]
+
+
+@dataclasses.dataclass(frozen=True)
+class Variant:
+    name: str
+    params: SearchParams
+    embedding_dtype: str = "float32"
+
+
+def load_queries(path: str) -> List[LabeledQuery]:
+    queries: List[LabeledQuery] = []
+    with open(path, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            query = str(item.get("query", "")).strip()
+            doc_ids = [str(doc_id) for doc_id in item.get("doc_ids", [])]
+            if not query or not doc_ids:
+                raise ValueError(f"{path}:{line_number}: expected non-empty 'query' and 'doc_ids'")
+            queries.append((query, doc_ids))
+    return queries
+
+
+def parse_variant(spec: str) -> Variant:
+    # "name" or "name:top_chunks=40,min_score=0.25,embedding_dtype=float16"
+    name, _, overrides = spec.partition(":")
+    fields = {field.name for field in dataclasses.fields(SearchParams)}
+    params: Dict[str, Any] = {}
+    embedding_dtype = "float32"
+    for item in filter(None, (part.strip() for part in overrides.split(","))):
+        key, sep, value = item.partition("=")
+        key = key.strip()
+        if not sep:
+            raise ValueError(f"Variant override must look like key=value: {item!r}")
+        if key == "embedding_dtype":
+            if value not in EMBEDDING_DTYPES:
+                raise ValueError(f"embedding_dtype must be one of {', '.join(EMBEDDING_DTYPES)}")
+            embedding_dtype = value
+        elif key in fields:
+            default = getattr(e5_search.DEFAULT_PARAMS, key)
+            if isinstance(default, bool):
+                params[key] = value.strip().lower() in {"1", "true", "yes", "on"}
+            else:
+                params[key] = type(default)(value)
+        else:
+            raise ValueError(f"Unknown variant setting: {key}")
+    return Variant(
+        name=name.strip() or spec,
+        params=dataclasses.replace(e5_search.DEFAULT_PARAMS, **params),
+        embedding_dtype=embedding_dtype,
+    )
+
+
+def ranked_doc_ids(hits: Sequence[Dict[str, Any]]) -> List[str]:
+    return list(dict.fromkeys(str(hit["doc_id"]) for hit in hits))
+
+
+def recall_at(ranking: Sequence[str], relevant: Sequence[str], k: int) -> float:
+    return len(set(ranking[:k]) & set(relevant)) / len(set(relevant))
+
+
+def reciprocal_rank(ranking: Sequence[str], relevant: Sequence[str]) -> float:
+    for position, doc_id in enumerate(ranking, start=1):
+        if doc_id in relevant:
+            return 1.0 / position
+    return 0.0
+
+
+def ndcg_at(ranking: Sequence[str], relevant: Sequence[str], k: int) -> float:
+    relevant_set = set(relevant)
+    dcg = sum(
+        1.0 / math.log2(position + 1)
+        for position, doc_id in enumerate(ranking[:k], start=1)
+        if doc_id in relevant_set
+    )
+    ideal = sum(1.0 / math.log2(position + 1) for position in range(1, min(k, len(relevant_set)) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def _variant_inputs(variant: Variant, state: SearchState, k_values: Sequence[int]) -> Tuple[np.ndarray, SearchParams]:
+    passage_embs = state.passage_embs.astype(variant.embedding_dtype, copy=False)
+    # Metrics look past the served cut-off so they show what a larger TOP_RESULTS would gain.
+    params = dataclasses.replace(variant.params, top_results=max(max(k_values), variant.params.top_results))
+    return passage_embs, params
+
+
+def evaluate_relevance(
+    variant: Variant,
+    state: SearchState,
+    queries: List[LabeledQuery],
+    k_values: Sequence[int],
+) -> Dict[str, Any]:
+    passage_embs, params = _variant_inputs(variant, state, k_values)
+    rankings = [
+        ranked_doc_ids(
+            e5_search.select_results(e5_search.rank_chunks(query, state.model, state.df, passage_embs, params), params)
+        )
+        for query, _ in queries
+    ]
+
+    pairs = [(ranking, relevant) for ranking, (_, relevant) in zip(rankings, queries)]
+    served = variant.params.top_results
+    report: Dict[str, Any] = {"variant": variant.name}
+    for k in k_values:
+        report[f"recall@{k}"] = float(np.mean([recall_at(r, rel, k) for r, rel in pairs]))
+    report["mrr"] = float(np.mean([reciprocal_rank(r, rel) for r, rel in pairs]))
+    for k in k_values:
+        report[f"ndcg@{k}"] = float(np.mean([ndcg_at(r, rel, k) for r, rel in pairs]))
+    # Recall at each variant's own top_results (listed in its settings), so
+    # every report has the same columns.
+    report["served_k"] = served
+    report["served_recall"] = float(np.mean([recall_at(r, rel, served) for r, rel in pairs]))
+    return report
+
+
+def measure_latency(
+    variant: Variant,
+    state: SearchState,
+    queries: List[LabeledQuery],
+    k_values: Sequence[int],
+    repeat: int = 1,
+) -> Dict[str, float]:
+    passage_embs, params = _variant_inputs(variant, state, k_values)
+
+    # One untimed query so lazy model initialisation does not land in p95.
+    e5_search.rank_chunks(queries[0][0], state.model, state.df, passage_embs, params)
+
+    latencies_ms: List[float] = []
+    for query, _ in queries:
+        for _ in range(max(1, repeat)):
+            started_at = time.perf_counter()
+            e5_search.select_results(e5_search.rank_chunks(query, state.model, state.df, passage_embs, params), params)
+            latencies_ms.append((time.perf_counter() - started_at) * 1000.0)
+
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    return {
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+    }
+
+
+def variant_footprint(variant: Variant, state: SearchState) -> Dict[str, Any]:
+    itemsize = np.dtype(variant.embedding_dtype).itemsize
+    return {
+        "index_mb": state.passage_embs.size * itemsize / (1024 * 1024),
+        "settings": {**dataclasses.asdict(variant.params), "embedding_dtype": variant.embedding_dtype},
+    }
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _print_table(reports: List[Dict[str, Any]]) -> None:
+    columns = list(dict.fromkeys(key for report in reports for key in report if key != "settings"))
+
+    def _cell(report: Dict[str, Any], key: str) -> str:
+        value = report.get(key)
+        if value is None:
+            return "-"
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    rows = [[_cell(report, key) for key in columns] for report in reports]
+    widths = [max(len(column), *(len(row[index]) for row in rows)) for index, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare search variants on relevance and latency.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="JSONL with {'query': ..., 'doc_ids': [...]}")
+    parser.add_argument(
+        "--variant",
+        action="append",
+        default=[],
+        help="name[:key=value,...] over SearchParams fields or embedding_dtype; repeatable",
+    )
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_K), help="cut-offs for recall and nDCG")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per query")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="variants scored for relevance concurrently (0 = all at once); latency is always timed one variant at a time",
+    )
+    parser.add_argument("--json", dest="json_path", help="also write the reports to this file")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    variants = [parse_variant("baseline")] + [parse_variant(spec) for spec in args.variant]
+    k_values = sorted(set(args.k))
+
+    state = e5_search.init_search()
+    rss_after_load = _peak_rss_mb()
+    print(f"model={e5_search.MODEL_NAME} chunks={len(state.df)} queries={len(queries)} variants={len(variants)}")
+
+    workers = args.workers if args.workers > 0 else len(variants)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(lambda variant: evaluate_relevance(variant, state, queries, k_values), variants))
+
+    # Serially, so one variant's timings do not include contention from another.
+    for variant, report in zip(variants, reports):
+        report.update(measure_latency(variant, state, queries, k_values, args.repeat))
+        report.update(variant_footprint(variant, state))
+
+    _print_table(reports)
+    print(f"peak_rss_mb: after_load={rss_after_load:.1f} after_eval={_peak_rss_mb():.1f}")
+
+    if args.json_path:
+        payload = {"queries": len(queries), "peak_rss_mb": _peak_rss_mb(), "variants": reports}
+        Path(args.json_path).write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
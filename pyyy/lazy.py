@@ -0,0 +1,30 @@
+import importlib
+import sys
+import types
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    # Placeholder bound at import time; the real module is imported on first
+    # attribute access, so processes that never touch it never pay for it.
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module: Any = None
+
+    def _load(self) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,230 @@
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are not guarded across processes.
+    fcntl = None
+
+
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+EMBED_THREADS_PER_WORKER = int(os.getenv("EMBED_THREADS_PER_WORKER", "0"))
+EMBED_SHARD_SIZE = int(os.getenv("EMBED_SHARD_SIZE", "512"))
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int], None]
+
+_WORKER_MODEL: Any = None
+
+
+def threads_per_worker(workers: int) -> int:
+    if EMBED_THREADS_PER_WORKER > 0:
+        return EMBED_THREADS_PER_WORKER
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def checkpoint_dir(cache_path: str, signature: str) -> Path:
+    return Path(f"{cache_path}.shards") / signature[:16]
+
+
+@contextmanager
+def rebuild_lock(cache_path: str) -> Iterator[None]:
+    # Serializes rebuilds of one cache file across processes (e.g. several
+    # uvicorn workers warming up at once); the others wait, then reuse the npz.
+    lock_path = Path(f"{cache_path}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def clear_checkpoints(directory: Path) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
+    try:
+        directory.parent.rmdir()
+    except OSError:
+        pass
+
+
+def _drop_stale_checkpoints(directory: Path) -> None:
+    # Only called under rebuild_lock, so no other process is writing a sibling.
+    if not directory.parent.exists():
+        return
+    for sibling in directory.parent.iterdir():
+        if sibling != directory and sibling.is_dir():
+            shutil.rmtree(sibling, ignore_errors=True)
+
+
+def _shard_path(directory: Path, index: int) -> Path:
+    return directory / f"shard-{index:05d}.npy"
+
+
+def _write_shard(directory: Path, index: int, embeddings: np.ndarray) -> None:
+    target = _shard_path(directory, index)
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "wb") as handle:
+        np.save(handle, np.asarray(embeddings, dtype=np.float32))
+    os.replace(tmp, target)
+
+
+def _shard_is_complete(directory: Path, index: int, expected_rows: int) -> bool:
+    path = _shard_path(directory, index)
+    if not path.exists():
+        return False
+    try:
+        shard = np.load(path, mmap_mode="r", allow_pickle=False)
+        return shard.ndim == 2 and shard.shape[0] == expected_rows
+    except Exception:
+        return False
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _WORKER_MODEL
+
+    # Thread env must be set before torch is imported in the child process.
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _WORKER_MODEL = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(directory: str, index: int, passages: List[str]) -> int:
+    from e5_search import embed_passages
+
+    _write_shard(Path(directory), index, embed_passages(_WORKER_MODEL, passages))
+    return len(passages)
+
+
+def build_embeddings(
+    passages: List[str],
+    directory: Path,
+    model_name: str,
+    model: Any = None,
+    workers: Optional[int] = None,
+    shard_size: int = EMBED_SHARD_SIZE,
+    progress: Optional[ProgressCallback] = None,
+) -> np.ndarray:
+    resolved_workers = max(1, workers if workers is not None else EMBED_WORKERS)
+    shard_size = max(1, shard_size)
+    total = len(passages)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    _drop_stale_checkpoints(directory)
+
+    bounds = [(start, min(start + shard_size, total)) for start in range(0, total, shard_size)]
+    pending = [
+        index
+        for index, (start, end) in enumerate(bounds)
+        if not _shard_is_complete(directory, index, end - start)
+    ]
+
+    done = total - sum(bounds[index][1] - bounds[index][0] for index in pending)
+    if done:
+        logger.info("Resuming embedding rebuild: %d/%d chunks already checkpointed", done, total)
+    if progress is not None:
+        progress(done, total)
+
+    started_at = time.perf_counter()
+    encoded = 0
+
+    def _report(count: int) -> None:
+        nonlocal done, encoded
+        done += count
+        encoded += count
+        if progress is not None:
+            progress(done, total)
+        elapsed = time.perf_counter() - started_at
+        rate = encoded / elapsed if elapsed > 0 else 0.0
+        logger.info("Embedded %d/%d chunks (%.1f chunks/s)", done, total, rate)
+
+    if pending and (resolved_workers == 1 or len(pending) == 1):
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_name)
+        from e5_search import embed_passages
+
+        for index in pending:
+            start, end = bounds[index]
+            _write_shard(directory, index, embed_passages(model, passages[start:end]))
+            _report(end - start)
+    elif pending:
+        pool_size = min(resolved_workers, len(pending))
+        threads = threads_per_worker(pool_size)
+        logger.info(
+            "Embedding %d shards with %d workers x %d threads", len(pending), pool_size, threads
+        )
+        with ProcessPoolExecutor(
+            max_workers=pool_size,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, threads),
+        ) as pool:
+            futures = {
+                pool.submit(_encode_shard, str(directory), index, passages[bounds[index][0] : bounds[index][1]])
+                for index in pending
+            }
+            while futures:
+                finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    _report(future.result())
+
+    elapsed = time.perf_counter() - started_at
+    if encoded:
+        logger.info(
+            "Embedding rebuild finished: %d chunks in %.1fs (%.1f chunks/s)",
+            encoded,
+            elapsed,
+            encoded / elapsed if elapsed > 0 else 0.0,
+        )
+
+    if not bounds:
+        return np.zeros((0, 0), dtype=np.float32)
+    shards = [np.load(_shard_path(directory, index), allow_pickle=False) for index in range(len(bounds))]
+    return np.concatenate(shards, axis=0).astype(np.float32, copy=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the passage embedding cache.")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--shard-size", type=int, default=EMBED_SHARD_SIZE)
+    parser.add_argument("--force", action="store_true", help="Ignore a valid cached npz.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    import e5_search
+
+    started_at = time.perf_counter()
+    count = e5_search.rebuild_embeddings_cache(
+        workers=args.workers,
+        shard_size=args.shard_size,
+        force=args.force,
+    )
+    elapsed = time.perf_counter() - started_at
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Index ready: {count} chunks in {elapsed:.1f}s ({rate:.1f} chunks/s)")
+
+
+if __name__ == "__main__":
+    main()
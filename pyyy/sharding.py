@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from e5_search import public_result, select_results
+
+
+SEARCH_SHARDS = [url.strip().rstrip("/") for url in os.getenv("SEARCH_SHARDS", "").split(",") if url.strip()]
+SHARD_TIMEOUT_S = float(os.getenv("SHARD_TIMEOUT_S", "10"))
+# Searches the coordinator fans out at once; the pool gets this many threads per shard.
+SHARD_CONCURRENCY = int(os.getenv("SHARD_CONCURRENCY", "32"))
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "").strip()
+
+logger = logging.getLogger(__name__)
+_POOL: Optional[ThreadPoolExecutor] = None
+
+
+class ShardsUnavailableError(RuntimeError):
+    pass
+
+
+def is_coordinator() -> bool:
+    return bool(SEARCH_SHARDS)
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(
+            max_workers=max(1, len(SEARCH_SHARDS)) * max(1, SHARD_CONCURRENCY),
+            thread_name_prefix="shard-fanout",
+        )
+    return _POOL
+
+
+def _post_json(url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    headers = {"Content-Type": "application/json"}
+    if ADMIN_API_TOKEN:
+        headers["X-Admin-Token"] = ADMIN_API_TOKEN
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _post_before(url: str, payload: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+    # Time spent queued for a pool thread counts against the same deadline.
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("deadline passed before the request was sent")
+    return _post_json(url, payload, remaining)
+
+
+def _fan_out(path: str, payload: Dict[str, Any]) -> tuple[Dict[str, Dict[str, Any]], List[str]]:
+    deadline = time.monotonic() + SHARD_TIMEOUT_S
+    futures = {
+        _pool().submit(_post_before, f"{url}{path}", payload, deadline): url
+        for url in SEARCH_SHARDS
+    }
+    done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+    replies: Dict[str, Dict[str, Any]] = {}
+    failed: List[str] = []
+    for future in not_done:
+        future.cancel()
+        failed.append(futures[future])
+        logger.warning("Shard %s timed out after %.1fs", futures[future], SHARD_TIMEOUT_S)
+    for future in done:
+        url = futures[future]
+        try:
+            replies[url] = future.result()
+        except (urllib.error.URLError, OSError, ValueError) as exc:
+            failed.append(url)
+            logger.warning("Shard %s failed: %s", url, exc)
+    return replies, sorted(failed)
+
+
+def scatter_search(
+    query: str,
+    fields: Optional[List[str]] = None,
+    snippet: bool = False,
+) -> Dict[str, Any]:
+    replies, failed = _fan_out(
+        "/shard/search",
+        {"query": query, "fields": fields, "snippet": snippet},
+    )
+    if not replies:
+        raise ShardsUnavailableError("No search shard answered in time")
+
+    hits: List[Dict[str, Any]] = []
+    for reply in replies.values():
+        hits.extend(reply.get("hits", []))
+    hits.sort(key=lambda hit: float(hit.get("rank_score", 0.0)), reverse=True)
+
+    return {
+        "results": [public_result(hit, fields) for hit in select_results(hits)],
+        "partial": bool(failed),
+        "failed_shards": failed,
+    }
+
+
+def broadcast_reload() -> List[str]:
+    _, failed = _fan_out("/shard/reload", {})
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local sharded search deployment.")
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="Coordinator port.")
+    parser.add_argument("--shard-base-port", type=int, default=8100)
+    args = parser.parse_args()
+
+    workdir = Path(__file__).resolve().parent
+    shard_urls: List[str] = []
+    processes: List[subprocess.Popen] = []
+
+    def _spawn(port: int, extra_env: Dict[str, str]) -> None:
+        env = {**os.environ, **extra_env}
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "api:app", "--host", args.host, "--port", str(port)],
+                cwd=workdir,
+                env=env,
+            )
+        )
+
+    for index in range(args.shards):
+        port = args.shard_base_port + index
+        shard_urls.append(f"http://{args.host}:{port}")
+        _spawn(port, {"SHARD_INDEX": str(index), "SHARD_COUNT": str(args.shards), "SEARCH_SHARDS": ""})
+    _spawn(args.port, {"SEARCH_SHARDS": ",".join(shard_urls)})
+
+    print(f"Coordinator: http://{args.host}:{args.port}  shards: {', '.join(shard_urls)}")
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
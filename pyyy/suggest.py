@@ -0,0 +1,126 @@
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+SUGGEST_LIMIT = int(os.getenv("SUGGEST_LIMIT", "8"))
+SUGGEST_TERMS = int(os.getenv("SUGGEST_TERMS", "5000"))
+MIN_TERM_LENGTH = 4
+MIN_PREFIX_LENGTH = 2
+# Upper bound on prefix matches inspected per lookup, keeps short prefixes cheap.
+_SCAN_LIMIT = 128
+_WORD = re.compile(r"[0-9a-zа-я]+(?:-[0-9a-zа-я]+)*")
+
+DocumentText = Tuple[str, str, str]
+
+
+def normalize_key(value: Any) -> str:
+    return " ".join(str(value).lower().replace("ё", "е").split())
+
+
+def _words(value: str) -> List[str]:
+    return _WORD.findall(normalize_key(value))
+
+
+class SuggestIndex:
+    # Sorted arrays searched with bisect: title suffixes starting at every word
+    # (so "отпуск" finds "Оформление отпуска") and the most frequent corpus terms.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._titles: Dict[str, str] = {}
+        self._title_norms: Dict[str, str] = {}
+        self._title_keys: List[Tuple[str, str]] = []
+        self._doc_terms: Dict[str, Counter] = {}
+        self._term_counts: Counter = Counter()
+        self._terms: List[str] = []
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[DocumentText]) -> "SuggestIndex":
+        index = cls()
+        index.apply_delta(documents, [])
+        return index
+
+    def _title_suffixes(self, title: str) -> List[str]:
+        words = normalize_key(title).split()
+        return [" ".join(words[start:]) for start in range(len(words))]
+
+    def _remove_doc(self, doc_id: str) -> None:
+        title = self._titles.pop(doc_id, None)
+        self._title_norms.pop(doc_id, None)
+        if title is not None:
+            for key in self._title_suffixes(title):
+                position = bisect_left(self._title_keys, (key, doc_id))
+                if position < len(self._title_keys) and self._title_keys[position] == (key, doc_id):
+                    del self._title_keys[position]
+
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms:
+            self._term_counts.subtract(terms)
+            for term in terms:
+                if self._term_counts[term] <= 0:
+                    del self._term_counts[term]
+
+    def _add_doc(self, doc_id: str, title: str, text: str) -> None:
+        if title:
+            self._titles[doc_id] = title
+            self._title_norms[doc_id] = normalize_key(title)
+            for key in self._title_suffixes(title):
+                insort(self._title_keys, (key, doc_id))
+
+        terms = Counter(word for word in _words(f"{title} {text}") if len(word) >= MIN_TERM_LENGTH)
+        self._doc_terms[doc_id] = terms
+        self._term_counts.update(terms)
+
+    def apply_delta(self, documents: Iterable[DocumentText], removed_doc_ids: Iterable[str]) -> None:
+        fresh: Dict[str, Tuple[str, List[str]]] = {}
+        for doc_id, title, text in documents:
+            entry = fresh.setdefault(str(doc_id), (str(title), []))
+            entry[1].append(str(text))
+
+        with self._lock:
+            for doc_id in set(map(str, removed_doc_ids)) | set(fresh):
+                self._remove_doc(doc_id)
+            for doc_id, (title, texts) in fresh.items():
+                self._add_doc(doc_id, title, " ".join(texts))
+            self._terms = sorted(term for term, _ in self._term_counts.most_common(SUGGEST_TERMS))
+
+    def lookup(self, prefix: str, limit: int = SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+        key = normalize_key(prefix)
+        if len(key) < MIN_PREFIX_LENGTH or limit <= 0:
+            return []
+
+        with self._lock:
+            titles: Dict[str, Tuple[int, int]] = {}
+            position = bisect_left(self._title_keys, (key, ""))
+            end = min(len(self._title_keys), position + _SCAN_LIMIT)
+            while position < end and self._title_keys[position][0].startswith(key):
+                suffix, doc_id = self._title_keys[position]
+                # Matches at the start of the title rank above mid-title matches.
+                rank = (0 if self._title_norms[doc_id] == suffix else 1, len(suffix))
+                if doc_id not in titles or rank < titles[doc_id]:
+                    titles[doc_id] = rank
+                position += 1
+
+            head, _, last = key.rpartition(" ")
+            terms: List[Tuple[int, str]] = []
+            if last:
+                position = bisect_left(self._terms, last)
+                end = min(len(self._terms), position + _SCAN_LIMIT)
+                while position < end and self._terms[position].startswith(last):
+                    term = self._terms[position]
+                    if term != last:
+                        terms.append((-self._term_counts[term], term))
+                    position += 1
+
+            suggestions: List[Dict[str, Any]] = [
+                {"text": self._titles[doc_id], "kind": "title", "doc_id": doc_id}
+                for doc_id, _ in sorted(titles.items(), key=lambda item: item[1])
+            ]
+
+        for _, term in sorted(terms):
+            suggestions.append({"text": f"{head} {term}".strip(), "kind": "term"})
+        return suggestions[:limit]
@@ -0,0 +1,27 @@
+import hashlib
+import sys
+import types
+
+import numpy as np
+
+
+class HashEncoder:
+    # Deterministic stand-in for SentenceTransformer: tests exercise index
+    # bookkeeping, not retrieval quality, and must not download a model.
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def encode(self, texts, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).normal(size=16)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def install() -> None:
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = HashEncoder
+    sys.modules["sentence_transformers"] = module
@@ -0,0 +1,154 @@
+import multiprocessing as mp
+import os
+import time
+import uuid
+
+import pytest
+
+# Point DATABASE_URL at a scratch database: the test seeds it from docs.csv if it
+# is empty and writes (then deletes) one document of its own.
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL is not set")
+
+CONVERGE_TIMEOUT_S = 15.0
+
+
+def _replica(conn, cache_dir: str, with_index: bool) -> None:
+    os.environ.update({"CHUNK_MODE": "chars", "CHANGE_FEED_POLL_S": "0.5"})
+    import fake_encoder
+
+    fake_encoder.install()
+    import change_feed
+    import e5_search
+
+    e5_search._index_cache_path = lambda csv_path: os.path.join(cache_dir, "replica.npz")
+    if with_index:
+        e5_search.init_search()
+    else:
+        # Like a coordinator or SERVE_MODE=documents: suggestions only.
+        e5_search.suggest_core("")
+    change_feed.start_listener()
+    conn.send("ready")
+
+    while True:
+        doc_id = conn.recv()
+        if doc_id is None:
+            return
+        state = e5_search._STATE
+        titles = []
+        if state is not None:
+            titles = state.df.loc[state.df["doc_id"].astype(str) == doc_id, "title"].astype(str).unique().tolist()
+        suggestions = [item.get("doc_id") for item in e5_search.suggest_core("интеграционный", 20)]
+        conn.send({"titles": titles, "suggested": doc_id in suggestions})
+
+
+def _wait_until(conn, doc_id: str, predicate) -> dict:
+    deadline = time.monotonic() + CONVERGE_TIMEOUT_S
+    while True:
+        conn.send(doc_id)
+        reply = conn.recv()
+        if predicate(reply) or time.monotonic() > deadline:
+            return reply
+        time.sleep(0.2)
+
+
+def _start_replica(tmp_path, with_index: bool):
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe()
+    process = ctx.Process(target=_replica, args=(child_conn, str(tmp_path), with_index), daemon=True)
+    process.start()
+    assert parent_conn.poll(120), "replica did not finish warming up"
+    assert parent_conn.recv() == "ready"
+    return parent_conn, process
+
+
+def _stop_replica(conn, process) -> None:
+    conn.send(None)
+    process.join(10)
+    if process.is_alive():
+        process.terminate()
+
+
+@pytest.fixture
+def replica(tmp_path):
+    conn, process = _start_replica(tmp_path, with_index=True)
+    yield conn
+    _stop_replica(conn, process)
+
+
+@pytest.fixture
+def suggest_replica(tmp_path):
+    conn, process = _start_replica(tmp_path, with_index=False)
+    yield conn
+    _stop_replica(conn, process)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    import chunking
+    import e5_search
+
+    monkeypatch.setattr(chunking, "CHUNK_MODE", "chars")
+    return e5_search
+
+
+def test_replica_converges_on_writes_from_another_process(replica, writer):
+    from e5_search import DocumentWrite
+
+    title = f"Интеграционный тест {uuid.uuid4().hex[:8]}"
+    created = writer.apply_write_batch([DocumentWrite(op="create", title=title, text="Первый текст документа.")])[0]
+    doc_id = created["doc_id"]
+    try:
+        reply = _wait_until(replica, doc_id, lambda r: r["titles"] == [title] and r["suggested"])
+        assert reply["titles"] == [title]
+        assert reply["suggested"]
+
+        renamed = f"{title} (обновлён)"
+        writer.apply_write_batch([DocumentWrite(op="update", doc_id=doc_id, title=renamed, text="Второй текст.")])
+        reply = _wait_until(replica, doc_id, lambda r: r["titles"] == [renamed])
+        assert reply["titles"] == [renamed]
+    finally:
+        writer.apply_write_batch([DocumentWrite(op="delete", doc_id=doc_id)])
+
+    reply = _wait_until(replica, doc_id, lambda r: not r["titles"] and not r["suggested"])
+    assert reply["titles"] == []
+    assert not reply["suggested"]
+
+
+def test_suggestions_follow_the_feed_without_a_search_index(suggest_replica, writer):
+    title = f"Интеграционный подсказки {uuid.uuid4().hex[:8]}"
+    doc_id = writer.apply_write_batch([writer.DocumentWrite(op="create", title=title, text="Текст.")])[0]["doc_id"]
+    try:
+        assert _wait_until(suggest_replica, doc_id, lambda r: r["suggested"])["suggested"]
+    finally:
+        writer.apply_write_batch([writer.DocumentWrite(op="delete", doc_id=doc_id)])
+    assert not _wait_until(suggest_replica, doc_id, lambda r: not r["suggested"])["suggested"]
+
+
+def test_failed_index_refresh_keeps_committed_db_writes(writer, monkeypatch):
+    import db
+
+    def _broken_sync():
+        raise RuntimeError("encoder crashed")
+
+    monkeypatch.setattr(writer, "sync_changes", _broken_sync)
+    result = writer.apply_write_batch([writer.DocumentWrite(op="create", title="Интеграционный сбой", text="Текст.")])[0]
+    try:
+        assert not isinstance(result, Exception)
+        assert not db.load_docs_df([result["doc_id"]]).empty
+    finally:
+        writer.apply_write_batch([writer.DocumentWrite(op="delete", doc_id=result["doc_id"])])
+
+
+def test_pruned_change_log_forces_a_reset(writer):
+    import db
+
+    before = db.latest_change_seq()
+    created = writer.apply_write_batch(
+        [writer.DocumentWrite(op="create", title="Интеграционный prune", text="Текст.")]
+    )[0]
+    writer.apply_write_batch([writer.DocumentWrite(op="delete", doc_id=created["doc_id"])])
+
+    assert db.prune_changes(0) >= 2
+    changes = db.fetch_changes_since(before)
+    assert changes and changes[0][2] == "reset"
+    assert db.fetch_changes_since(db.latest_change_seq()) == []
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+import chunking
+import e5_search
+
+
+def _words(sentence):
+    return [match.span() for match in re.finditer(r"\S+", sentence)]
+
+
+def _pack(sentences, budget, overlap):
+    offsets = [_words(sentence) for sentence in sentences]
+    return chunking.pack_sentences(sentences, [len(o) for o in offsets], offsets, budget, overlap)
+
+
+def _reassemble(packed):
+    chunks = [(chunk, overlap_chars) for chunk, _, overlap_chars in packed]
+    rows = e5_search._document_rows("DOC0001", "Заголовок", chunks, "general", "internal", "2026-01-01", "2026-01-01")
+    return e5_search._collect_full_text(rows)
+
+
+def test_overlap_is_recorded_and_stripped_exactly():
+    sentences = ["Один два три.", "Четыре пять.", "Шесть семь восемь.", "Девять десять."]
+    packed = _pack(sentences, budget=6, overlap=3)
+
+    assert [overlap for _, _, overlap in packed] == [0, len("Четыре пять.") + 1, len("Шесть семь восемь.") + 1]
+    assert packed[1][0].startswith("Четыре пять. ")
+    assert _reassemble(packed).split() == " ".join(sentences).split()
+
+
+def test_repeated_sentences_survive_without_overlap():
+    # Real text may repeat the previous chunk's last sentence; nothing was
+    # written as overlap, so nothing may be removed.
+    sentences = ["Первый пункт длинный.", "Да.", "Да.", "Последний пункт."]
+    packed = _pack(sentences, budget=4, overlap=0)
+
+    assert all(overlap == 0 for _, _, overlap in packed)
+    assert _reassemble(packed).split() == " ".join(sentences).split()
+
+
+def test_chunk_made_only_of_carried_overlap_is_not_emitted():
+    long_sentence = " ".join(f"слово{index}" for index in range(12)) + "."
+    packed = _pack(["Раз два.", "Три четыре.", long_sentence], budget=5, overlap=2)
+
+    texts = [chunk for chunk, _, _ in packed]
+    assert texts[0] == "Раз два. Три четыре."
+    assert "Три четыре." not in texts[1:]
+    assert _reassemble(packed).split() == " ".join(["Раз два.", "Три четыре.", long_sentence]).split()
+
+
+def test_rechunk_keeps_document_metadata(monkeypatch):
+    monkeypatch.setattr(chunking, "CHUNK_MODE", "chars")
+    rows = e5_search._document_rows(
+        "DOC0001", "Заголовок", [("Первая часть.", 0), ("Вторая часть.", 0)], "hr", "internal", "2025-01-01", "2025-02-01"
+    )
+    batch = e5_search._WriteBatch({"DOC0001": rows}, 1)
+
+    assert batch.apply(e5_search.DocumentWrite(op="rechunk", doc_id="DOC0001")) is True
+    fresh = batch.upserts()["DOC0001"]
+    assert fresh["text"].tolist() == ["Первая часть. Вторая часть."]
+    assert fresh["updated_at"].tolist() == ["2025-02-01"]
+    assert fresh["department"].tolist() == ["hr"]
+    assert batch.apply(e5_search.DocumentWrite(op="rechunk", doc_id="DOC0002")) is False
+
+
+def test_missing_tokenizer_fails_instead_of_falling_back(monkeypatch):
+    def _offline(*args, **kwargs):
+        raise OSError("no network")
+
+    monkeypatch.setattr(chunking, "CHUNK_MODE", "tokens")
+    monkeypatch.setattr(chunking, "split_by_tokens", _offline)
+    with pytest.raises(RuntimeError, match="CHUNK_MODE=chars"):
+        e5_search._split_text_to_chunks("Текст документа.", title="Заголовок")
@@ -0,0 +1,67 @@
+import multiprocessing as mp
+import os
+
+import numpy as np
+import pytest
+
+import e5_search
+from fake_encoder import HashEncoder
+
+
+class CountingEncoder(HashEncoder):
+    def __init__(self, log_path):
+        self.log_path = log_path
+
+    def encode(self, texts, **kwargs):
+        with open(self.log_path, "a", encoding="utf-8") as log:
+            log.write(f"{os.getpid()} {len(texts)}\n")
+        return super().encode(texts, **kwargs)
+
+
+def _docs(second_text):
+    rows = [
+        e5_search._document_rows("DOC0001", "Отпуск", [("Отпуск оформляется заранее.", 0)], "hr", "internal", "", ""),
+        e5_search._document_rows("DOC0002", "Бюджет", [(second_text, 0)], "fin", "internal", "", ""),
+    ]
+    return e5_search._ensure_admin_columns(e5_search.pd.concat(rows, ignore_index=True))
+
+
+def _warm(df, log_path):
+    e5_search._embed_with_cache(CountingEncoder(log_path), "docs.csv", df)
+
+
+@pytest.mark.skipif(e5_search.rebuild_index.fcntl is None, reason="needs fcntl file locks")
+def test_concurrent_incremental_refresh_encodes_once(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "docs.embeddings.npz")
+    log_path = str(tmp_path / "encode.log")
+    monkeypatch.setattr(e5_search, "_index_cache_path", lambda csv_path: cache_path)
+
+    e5_search._save_cached_embeddings("docs.csv", _docs("Старый текст."), HashEncoder().encode(["a", "b"]))
+    df = _docs("Бюджет согласуется в марте.")
+
+    ctx = mp.get_context("fork")
+    workers = [ctx.Process(target=_warm, args=(df, log_path)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    # Only the changed chunk was encoded, and by one process; the rest reused its npz.
+    with open(log_path, encoding="utf-8") as log:
+        assert [line.split()[1] for line in log] == ["1"]
+    cached = e5_search._load_cached_embeddings("docs.csv", df)
+    assert cached is not None and cached.shape[0] == 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_failed_save_leaves_no_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(e5_search, "_index_cache_path", lambda csv_path: str(tmp_path / "docs.embeddings.npz"))
+
+    def _broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez_compressed", _broken)
+    with pytest.raises(OSError):
+        e5_search._save_cached_embeddings("docs.csv", _docs("Текст."), np.zeros((2, 4), dtype=np.float32))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,34 @@
+import types
+
+import e5_search
+import evaluate
+
+
+def _hits(*doc_ids):
+    return [{"rank_score": 1.0 - index / 10, "doc_id": doc_id} for index, doc_id in enumerate(doc_ids)]
+
+
+def test_variants_with_different_top_results_share_columns(monkeypatch, capsys):
+    monkeypatch.setattr(e5_search, "rank_chunks", lambda *args, **kwargs: _hits("D1", "D2", "D3", "D4", "D5", "D6"))
+    state = types.SimpleNamespace(model=None, df=None, passage_embs=e5_search.np.zeros((6, 4), dtype="float32"))
+    queries = [("отпуск", ["D5"])]
+    variants = [evaluate.parse_variant("baseline:top_results=3"), evaluate.parse_variant("t5:top_results=5")]
+
+    reports = [evaluate.evaluate_relevance(variant, state, queries, [1, 3]) for variant in variants]
+
+    assert [report["served_k"] for report in reports] == [3, 5]
+    assert [report["served_recall"] for report in reports] == [0.0, 1.0]
+    assert list(reports[0]) == list(reports[1])
+
+    evaluate._print_table(reports)
+    lines = capsys.readouterr().out.splitlines()
+    assert "served_recall" in lines[0] and len(lines) == 3
+
+
+def test_table_marks_missing_values(capsys):
+    evaluate._print_table([{"variant": "a", "mrr": 0.5}, {"variant": "b", "latency_ms_p50": 1.25}])
+
+    header, first, second = capsys.readouterr().out.splitlines()
+    assert header.split() == ["variant", "mrr", "latency_ms_p50"]
+    assert first.split() == ["a", "0.500", "-"]
+    assert second.split() == ["b", "-", "1.250"]
@@ -0,0 +1,55 @@
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    def _search(query, state=None, fields=None, snippet=False):
+        calls.append((query, fields, snippet))
+        return [{"doc_id": "DOC0001", "title": "Отпуск"}]
+
+    monkeypatch.setattr(api, "_ready_search_state", lambda: object())
+    monkeypatch.setattr(
+        api,
+        "search_etag",
+        lambda state, query, fields=None, snippet=False: f'"{hashlib.md5(f"{query}|{fields}|{snippet}".encode()).hexdigest()}"',
+    )
+    monkeypatch.setattr(api, "search_core", _search)
+    test_client = TestClient(api.app)
+    test_client.calls = calls
+    return test_client
+
+
+def test_get_search_revalidates_with_etag(client):
+    first = client.get("/search", params={"q": "отпуск", "fields": "doc_id,title", "snippet": "true"})
+    assert first.status_code == 200
+    assert first.json()["results"] == [{"doc_id": "DOC0001", "title": "Отпуск"}]
+    assert first.headers["cache-control"] == "no-cache"
+    assert client.calls == [("отпуск", ["doc_id", "title"], True)]
+
+    again = client.get(
+        "/search",
+        params={"q": "отпуск", "fields": "doc_id,title", "snippet": "true"},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+    assert len(client.calls) == 1
+
+
+def test_get_search_rejects_unknown_fields(client):
+    assert client.get("/search", params={"q": "отпуск", "fields": "doc_id,secret"}).status_code == 400
+
+
+def test_post_search_ignores_if_none_match(client):
+    first = client.post("/search", json={"query": "отпуск"})
+    again = client.post("/search", json={"query": "отпуск"}, headers={"If-None-Match": first.headers["etag"]})
+
+    assert again.status_code == 200
+    assert again.json()["results"]
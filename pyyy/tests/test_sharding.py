@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import sharding
+
+
+SHARD_DELAY_S = 0.4
+
+
+class _SlowShard(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SHARD_DELAY_S)
+        port = self.server.server_address[1]
+        body = json.dumps(
+            {"hits": [{"rank_score": 0.5, "score": 0.5, "doc_id": f"DOC{port}", "title": "t", "text": "x"}]}
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_shards(monkeypatch):
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), _SlowShard) for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        sharding, "SEARCH_SHARDS", [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    )
+    monkeypatch.setattr(sharding, "SHARD_TIMEOUT_S", 1.0)
+    monkeypatch.setattr(sharding, "_POOL", None)
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_scatter_searches_do_not_queue_into_timeouts(slow_shards):
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        results = list(callers.map(lambda _: sharding.scatter_search("отпуск"), range(8)))
+
+    for result in results:
+        assert result["partial"] is False
+        assert result["failed_shards"] == []
+        assert len(result["results"]) == 2
+
+
+def test_deadline_covers_time_spent_queued(slow_shards, monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_CONCURRENCY", 1)
+    monkeypatch.setattr(sharding, "SHARD_TIMEOUT_S", 0.6)
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as callers:
+        outcomes = list(callers.map(lambda _: _scatter_or_error(), range(4)))
+    elapsed = time.monotonic() - started_at
+
+    # Two searches fit the pool; the queued ones fail at the shared deadline instead of
+    # each getting a fresh SHARD_TIMEOUT_S once a thread frees up.
+    assert outcomes.count("ok") >= 1
+    assert "unavailable" in outcomes
+    assert elapsed < 0.6 + SHARD_DELAY_S + 0.5
+
+
+def _scatter_or_error() -> str:
+    try:
+        sharding.scatter_search("отпуск")
+    except sharding.ShardsUnavailableError:
+        return "unavailable"
+    return "ok"
@@ -0,0 +1,104 @@
+import types
+
+import e5_search
+
+
+def _snippet(text, terms, max_chars):
+    return e5_search.build_snippet(text, e5_search._sentence_offsets(text), terms, max_chars=max_chars)
+
+
+def test_sentence_offsets_cover_each_sentence():
+    text = "Первое предложение. Второе! Хвост без точки"
+    spans = [text[start:end].strip() for start, end in e5_search._sentence_offsets(text)]
+    assert spans == ["Первое предложение.", "Второе!", "Хвост без точки"]
+
+
+def test_short_text_is_returned_whole():
+    text = "Отпуск оформляется заранее."
+    assert _snippet(text, ["отпуск"], max_chars=100) == text
+
+
+def test_window_starts_at_the_best_matching_sentence():
+    text = "Вводная часть документа. Отпуск оформляется за две недели. Заключение и подписи."
+    snippet = _snippet(text, ["отпуск", "недел"], max_chars=45)
+
+    assert snippet == "…Отпуск оформляется за две недели.…"
+
+
+def test_no_term_hits_falls_back_to_the_opening():
+    text = "Первое предложение здесь. Второе предложение здесь. Третье предложение здесь."
+    snippet = _snippet(text, ["бюджет"], max_chars=55)
+
+    assert snippet == "Первое предложение здесь. Второе предложение здесь.…"
+    assert not snippet.startswith("…")
+
+
+def test_long_sentence_is_windowed_around_the_matched_term():
+    words = [f"слово{index:02d}" for index in range(40)]
+    words[30] = "бюджет"
+    text = " ".join(words) + "."
+    snippet = _snippet(text, ["бюджет"], max_chars=60)
+
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "бюджет" in snippet
+    assert len(snippet) <= 60 + 2
+    # The anchor sits a quarter of the window from the start.
+    assert snippet.index("бюджет") <= 60 // 4 + 1
+
+
+def test_final_sentence_has_no_trailing_marker():
+    text = "Вводная часть документа. Отпуск оформляется за две недели."
+    snippet = _snippet(text, ["отпуск"], max_chars=40)
+
+    assert snippet == "…Отпуск оформляется за две недели."
+
+
+def _hits():
+    return [
+        {
+            "rank_score": 0.9,
+            "row": 0,
+            "score": 0.8,
+            "doc_id": "DOC0001",
+            "chunk_id": "DOC0001_C01",
+            "title": "Отпуск",
+            "text": "Вводная часть документа. Отпуск оформляется за две недели. Заключение и подписи.",
+        }
+    ]
+
+
+def _state():
+    return types.SimpleNamespace(
+        model=None,
+        df=None,
+        passage_embs=None,
+        sentence_offsets=[e5_search._sentence_offsets(_hits()[0]["text"])],
+    )
+
+
+def test_fields_without_text_still_get_a_snippet(monkeypatch):
+    monkeypatch.setattr(e5_search, "rank_chunks", lambda *args, **kwargs: _hits())
+    monkeypatch.setattr(e5_search, "build_snippet", lambda text, offsets, terms: "snippet")
+
+    results = e5_search.search_core("отпуск", state=_state(), fields=["doc_id", "snippet"], snippet=True)
+
+    assert results == [{"doc_id": "DOC0001", "snippet": "snippet"}]
+
+
+def test_shard_projection_keeps_the_merge_keys(monkeypatch):
+    monkeypatch.setattr(e5_search, "rank_chunks", lambda *args, **kwargs: _hits())
+
+    hits = e5_search.shard_search_core("отпуск", state=_state(), fields=["title", "snippet"], snippet=True)
+
+    assert list(hits[0]) == ["rank_score", "doc_id", "title", "snippet"]
+    assert "Отпуск" in hits[0]["snippet"]
+    assert "text" not in hits[0]
+
+
+def test_full_results_drop_internal_keys(monkeypatch):
+    monkeypatch.setattr(e5_search, "rank_chunks", lambda *args, **kwargs: _hits())
+
+    result = e5_search.search_core("отпуск", state=_state(), fields=None, snippet=True)[0]
+
+    assert "row" not in result and "rank_score" not in result
+    assert {"doc_id", "chunk_id", "title", "text", "snippet"} <= set(result)
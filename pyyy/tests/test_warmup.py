@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pytest
+
+import warmup
+
+
+@pytest.fixture(autouse=True)
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(warmup, "_ready", threading.Event())
+    monkeypatch.setattr(warmup, "_settled", threading.Event())
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_warmup", warmup._new_run())
+    monkeypatch.setattr(warmup, "_reload", None)
+
+
+def _run_to_indexing(total: int = 4) -> None:
+    warmup.begin(warmup.LOADING_DOCS)
+    warmup.begin(warmup.EMBEDDING, total=total)
+    warmup.progress(total, total)
+    warmup.begin(warmup.INDEXING)
+
+
+def test_indexing_keeps_final_embedding_progress():
+    _run_to_indexing()
+    assert warmup.status()["progress"] == {"done": 4, "total": 4}
+    warmup.finish()
+    assert warmup.status()["progress"] == {"done": 4, "total": 4}
+
+
+def test_failed_reload_is_reported_apart_from_readiness():
+    _run_to_indexing()
+    warmup.finish()
+
+    warmup.begin(warmup.LOADING_DOCS)
+    warmup.fail(RuntimeError("boom"))
+
+    status = warmup.status()
+    assert status["ready"] is True
+    assert status["phase"] == warmup.READY
+    assert "error" not in status
+    assert status["reload"]["phase"] == warmup.FAILED
+    assert status["reload"]["error"] == "RuntimeError: boom"
+
+    _run_to_indexing(total=6)
+    warmup.finish()
+    status = warmup.status()
+    assert status["reload"]["phase"] == warmup.READY
+    assert status["reload"]["progress"] == {"done": 6, "total": 6}
+    assert "error" not in status["reload"]
+
+
+def test_first_warmup_failure_is_not_ready():
+    warmup.begin(warmup.LOADING_DOCS)
+    warmup.fail(OSError("no model"))
+
+    status = warmup.status()
+    assert status["ready"] is False
+    assert status["phase"] == warmup.FAILED
+    assert "reload" not in status
+
+
+def test_concurrent_init_search_loads_and_embeds_once(tmp_path, monkeypatch):
+    import chunking
+    import db
+    import e5_search
+    from fake_encoder import HashEncoder
+
+    loads, encoded = [], []
+
+    class CountingEncoder(HashEncoder):
+        def encode(self, texts, **kwargs):
+            encoded.extend(texts)
+            return super().encode(texts, **kwargs)
+
+    def _load_model():
+        loads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return CountingEncoder()
+
+    csv_path = str(tmp_path / "docs.csv")
+    rows = e5_search._document_rows("DOC0001", "Отпуск", [("Отпуск оформляется заранее.", 0)], "hr", "internal", "", "")
+    rows.to_csv(csv_path, index=False, encoding="utf-8")
+    monkeypatch.setattr(db, "DATABASE_URL", "")
+    monkeypatch.setattr(chunking, "CHUNK_MODE", "chars")
+    monkeypatch.setattr(e5_search, "pick_csv_path", lambda: csv_path)
+    monkeypatch.setattr(e5_search, "_index_cache_path", lambda path: str(tmp_path / "docs.embeddings.npz"))
+    monkeypatch.setattr(e5_search, "load_model", _load_model)
+    monkeypatch.setattr(e5_search, "_STATE", None)
+    monkeypatch.setattr(e5_search, "_SUGGESTIONS", None)
+
+    states = []
+    threads = [threading.Thread(target=lambda: states.append(e5_search.init_search())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert len(loads) == 1
+    assert len(encoded) == 1
+    assert len(states) == 2 and states[0] is states[1]
+    assert warmup.status()["phase"] == warmup.READY
+
+
+@pytest.fixture
+def search_client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    monkeypatch.setattr(api, "search_etag", lambda state, query, fields=None, snippet=False: '"etag"')
+    monkeypatch.setattr(api, "search_core", lambda query, state=None, fields=None, snippet=False: [])
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_AFTER_S", 7)
+    return api, TestClient(api.app)
+
+
+def _slow_init(delay_s: float, calls: list):
+    def _init(force: bool = False):
+        calls.append(force)
+        if not warmup.is_ready():
+            warmup.begin(warmup.LOADING_MODEL)
+            time.sleep(delay_s)
+            warmup.finish()
+        return object()
+
+    return _init
+
+
+def test_search_while_warming_returns_503_with_retry_after(search_client, monkeypatch):
+    api, client = search_client
+    monkeypatch.setattr(api, "init_search", _slow_init(1.0, []))
+    monkeypatch.setattr(warmup, "WARMUP_WAIT_S", 0.1)
+
+    response = client.get("/search", params={"q": "отпуск"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+    assert "loading_model" in response.json()["detail"]
+    warmup.wait_ready(5)
+
+
+def test_search_that_waits_out_the_warmup_succeeds(search_client, monkeypatch):
+    api, client = search_client
+    monkeypatch.setattr(api, "init_search", _slow_init(0.2, []))
+    monkeypatch.setattr(warmup, "WARMUP_WAIT_S", 5)
+
+    response = client.get("/search", params={"q": "отпуск"})
+
+    assert response.status_code == 200
+    assert response.json() == {"query": "отпуск", "results": []}
+
+
+def test_failed_warmup_is_not_restarted_by_every_request(search_client, monkeypatch):
+    api, client = search_client
+    attempts = []
+
+    def _broken_init(force: bool = False):
+        attempts.append(force)
+        warmup.begin(warmup.LOADING_MODEL)
+        warmup.fail(OSError("model download failed"))
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(api, "init_search", _broken_init)
+    monkeypatch.setattr(warmup, "WARMUP_WAIT_S", 5)
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_BACKOFF_S", 60)
+
+    started_at = time.perf_counter()
+    first = client.get("/search", params={"q": "отпуск"})
+    second = client.get("/search", params={"q": "отпуск"})
+
+    assert first.status_code == 503 and second.status_code == 503
+    # The failure ends the wait early instead of holding the request for WARMUP_WAIT_S.
+    assert time.perf_counter() - started_at < 2
+    assert len(attempts) == 1
+    assert int(second.headers["retry-after"]) > 7
+
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_BACKOFF_S", 0)
+    client.get("/search", params={"q": "отпуск"})
+    assert len(attempts) == 2
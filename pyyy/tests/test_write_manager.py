@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+import e5_search
+import write_manager
+from e5_search import DocumentWrite
+
+
+@pytest.fixture
+def slow_writer(monkeypatch):
+    applied = []
+
+    def _apply(writes):
+        time.sleep(0.5)
+        applied.extend(write.doc_id for write in writes)
+        return [True] * len(writes)
+
+    monkeypatch.setattr(write_manager, "apply_write_batch", _apply)
+    write_manager.start_writer()
+    return applied
+
+
+def test_queued_write_that_times_out_is_never_applied(slow_writer):
+    first = threading.Thread(target=write_manager.submit, args=(DocumentWrite(op="delete", doc_id="A"), 5))
+    first.start()
+    time.sleep(0.1)
+
+    with pytest.raises(write_manager.WriteTimeoutError) as excinfo:
+        write_manager.submit(DocumentWrite(op="delete", doc_id="B"), timeout=0.1)
+    assert not excinfo.value.started
+
+    first.join()
+    time.sleep(0.1)
+    assert slow_writer == ["A"]
+
+
+def test_write_that_times_out_while_committing_reports_started(slow_writer):
+    with pytest.raises(write_manager.WriteTimeoutError) as excinfo:
+        write_manager.submit(DocumentWrite(op="delete", doc_id="C"), timeout=0.1)
+    assert excinfo.value.started
+    time.sleep(0.6)
+    assert "C" in slow_writer
+
+
+def test_unexpected_error_fails_only_its_own_write():
+    class _Batch:
+        def apply(self, write):
+            if write.doc_id == "bad":
+                raise KeyError(write.doc_id)
+            return write.doc_id
+
+    writes = [DocumentWrite(op="delete", doc_id=doc_id) for doc_id in ("a", "bad", "b")]
+    results = e5_search._run_writes(_Batch(), writes)
+
+    assert results[0] == "a" and results[2] == "b"
+    assert isinstance(results[1], KeyError)
+
+
+@pytest.mark.parametrize("started, status", [(False, 503), (True, 504)])
+def test_write_timeouts_map_to_service_errors(monkeypatch, started, status):
+    from fastapi.testclient import TestClient
+
+    import api
+
+    def _timeout(write, timeout=None):
+        raise write_manager.WriteTimeoutError("Write timed out", started=started)
+
+    monkeypatch.setattr(api, "ADMIN_API_TOKEN", "secret")
+    monkeypatch.setattr(write_manager, "submit", _timeout)
+    response = TestClient(api.app).delete("/documents/DOC0001", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == status
+    assert "timed out" in response.json()["detail"]
+
+
+def test_failed_index_refresh_keeps_committed_csv_writes(tmp_path, monkeypatch):
+    import chunking
+    import db
+
+    class BrokenEncoder:
+        def encode(self, texts, **kwargs):
+            raise RuntimeError("encoder crashed")
+
+    csv_path = str(tmp_path / "docs.csv")
+    df = e5_search._document_rows("DOC0001", "Отпуск", [("Отпуск оформляется заранее.", 0)], "hr", "internal", "", "")
+    df.to_csv(csv_path, index=False, encoding="utf-8")
+    monkeypatch.setattr(db, "DATABASE_URL", "")
+    monkeypatch.setattr(chunking, "CHUNK_MODE", "chars")
+    monkeypatch.setattr(e5_search, "pick_csv_path", lambda: csv_path)
+    monkeypatch.setattr(
+        e5_search,
+        "_STATE",
+        e5_search.SearchState(
+            model=BrokenEncoder(),
+            df=df,
+            passage_embs=e5_search.np.zeros((1, 4), dtype=e5_search.np.float32),
+            csv_path=csv_path,
+            sentence_offsets=[e5_search._sentence_offsets(text) for text in df["text"]],
+            signature=e5_search._docs_signature(df),
+        ),
+    )
+    monkeypatch.setattr(e5_search, "_SUGGESTIONS", None)
+
+    result = e5_search.apply_write_batch([DocumentWrite(op="create", title="Бюджет", text="Бюджет на год.")])[0]
+
+    assert result["doc_id"] == "DOC0002"
+    assert "DOC0002" in e5_search.pd.read_csv(csv_path)["doc_id"].tolist()
+    # The stale index is dropped and rebuilt from the CSV on next use.
+    assert e5_search._STATE is None
@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+# How long a search request waits for an in-flight warmup before giving up with 503.
+WARMUP_WAIT_S = float(os.getenv("WARMUP_WAIT_S", "10"))
+WARMUP_RETRY_AFTER_S = int(os.getenv("WARMUP_RETRY_AFTER_S", "5"))
+# A failed first-time load is retried by search requests at most this often,
+# instead of every request starting a new model load and waiting on it.
+WARMUP_RETRY_BACKOFF_S = float(os.getenv("WARMUP_RETRY_BACKOFF_S", "30"))
+
+PENDING = "pending"
+LOADING_DOCS = "loading_docs"
+LOADING_MODEL = "loading_model"
+EMBEDDING = "embedding"
+INDEXING = "indexing"
+READY = "ready"
+FAILED = "failed"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_ready = threading.Event()
+# Set whenever a run finishes or fails, so waiters do not sit out a failure.
+_settled = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _new_run() -> Dict[str, Any]:
+    return {
+        "phase": PENDING,
+        "done": 0,
+        "total": 0,
+        "error": None,
+        "started_at": None,
+        "phase_started_at": None,
+        "failed_at": None,
+        "timings": [],
+    }
+
+
+# First-time warmup decides readiness; once the index has been served, later
+# runs are reloads and are reported on their own so a failed reload does not
+# read as "ready: true, phase: failed".
+_warmup: Dict[str, Any] = _new_run()
+_reload: Optional[Dict[str, Any]] = None
+
+
+def _active() -> Dict[str, Any]:
+    if _ready.is_set() and _reload is not None:
+        return _reload
+    return _warmup
+
+
+def _close_phase(run: Dict[str, Any], now: float) -> None:
+    phase, phase_started_at = run["phase"], run["phase_started_at"]
+    if phase_started_at is None or phase in {PENDING, READY, FAILED}:
+        return
+    elapsed = now - phase_started_at
+    run["timings"].append((phase, elapsed))
+    logger.info("%s phase %s took %.2fs", "Reload" if run is _reload else "Warmup", phase, elapsed)
+
+
+def begin(phase: str, total: int = 0) -> None:
+    global _reload
+    now = time.perf_counter()
+    with _lock:
+        run = _active()
+        starting = run["phase"] in {PENDING, READY, FAILED}
+        if starting:
+            if _ready.is_set():
+                _reload = run = _new_run()
+            run.update(started_at=now, error=None, failed_at=None)
+            run["timings"].clear()
+        else:
+            _close_phase(run, now)
+        # Phases without their own counter keep the last one, e.g. the final
+        # embedding progress stays visible while indexing.
+        if starting or total:
+            run.update(done=0, total=total)
+        run.update(phase=phase, phase_started_at=now)
+
+
+def progress(done: int, total: int) -> None:
+    with _lock:
+        _active().update(done=done, total=total)
+
+
+def finish() -> None:
+    now = time.perf_counter()
+    with _lock:
+        run = _active()
+        _close_phase(run, now)
+        started_at = run["started_at"]
+        run.update(phase=READY, phase_started_at=None)
+    if started_at is not None:
+        logger.info("Search index %s in %.2fs", "reloaded" if run is _reload else "ready", now - started_at)
+    _ready.set()
+    _settled.set()
+
+
+def fail(exc: BaseException) -> None:
+    with _lock:
+        run = _active()
+        now = time.perf_counter()
+        _close_phase(run, now)
+        run.update(phase=FAILED, error=f"{type(exc).__name__}: {exc}", phase_started_at=None, failed_at=now)
+    _settled.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_ready(timeout: float = WARMUP_WAIT_S) -> bool:
+    # Returns early, with False, when the run fails.
+    _settled.wait(timeout=max(0.0, timeout))
+    return _ready.is_set()
+
+
+def retry_in() -> float:
+    # Seconds until a failed first-time warmup may be started again (0 = now).
+    with _lock:
+        failed_at = _warmup["failed_at"]
+    if failed_at is None:
+        return 0.0
+    return max(0.0, failed_at + WARMUP_RETRY_BACKOFF_S - time.perf_counter())
+
+
+def _snapshot(run: Dict[str, Any], now: float) -> Dict[str, Any]:
+    snapshot: Dict[str, Any] = {
+        "phase": run["phase"],
+        "progress": {"done": run["done"], "total": run["total"]},
+        "phase_timings_s": {phase: round(elapsed, 3) for phase, elapsed in run["timings"]},
+    }
+    if run["phase_started_at"] is not None:
+        snapshot["phase_elapsed_s"] = round(now - run["phase_started_at"], 3)
+    if run["error"]:
+        snapshot["error"] = run["error"]
+    return snapshot
+
+
+def status() -> Dict[str, Any]:
+    now = time.perf_counter()
+    with _lock:
+        snapshot: Dict[str, Any] = {"ready": _ready.is_set(), **_snapshot(_warmup, now)}
+        if _reload is not None:
+            snapshot["reload"] = _snapshot(_reload, now)
+    return snapshot
+
+
+def start(target: Callable[[], Any]) -> bool:
+    # Single-flight: while a warmup thread is alive, later callers just wait on it.
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return False
+        if not _ready.is_set():
+            _settled.clear()
+        _thread = threading.Thread(target=_run, args=(target,), name="search-warmup", daemon=True)
+        _thread.start()
+    return True
+
+
+def _run(target: Callable[[], Any]) -> None:
+    try:
+        target()
+    except Exception:
+        logger.exception("Background search warmup failed")
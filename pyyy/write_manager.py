@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from e5_search import DocumentWrite, apply_write_batch
+
+
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+# How long the writer lingers after the first queued write to collect a burst.
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "5"))
+WRITE_TIMEOUT_S = float(os.getenv("WRITE_TIMEOUT_S", "120"))
+
+logger = logging.getLogger(__name__)
+
+
+class WriteTimeoutError(TimeoutError):
+    # started=False: the write was withdrawn from the queue and will never be
+    # applied. started=True: it was already being committed and may still land.
+
+    def __init__(self, message: str, started: bool):
+        super().__init__(message)
+        self.started = started
+
+
+_QUEUE: "queue.Queue[Tuple[DocumentWrite, Future, float]]" = queue.Queue()
+_writer_started = False
+_writer_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_latencies_ms: Deque[float] = deque(maxlen=2048)
+_batch_sizes: Deque[int] = deque(maxlen=2048)
+_totals = {"writes": 0, "failed": 0, "batches": 0, "commit_s": 0.0}
+
+
+def _collect_batch() -> List[Tuple[DocumentWrite, Future, float]]:
+    batch = [_QUEUE.get()]
+    deadline = time.monotonic() + WRITE_BATCH_WINDOW_MS / 1000.0
+    while len(batch) < WRITE_BATCH_MAX:
+        remaining = deadline - time.monotonic()
+        try:
+            batch.append(_QUEUE.get(timeout=remaining) if remaining > 0 else _QUEUE.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _record(batch_size: int, commit_s: float, latencies_ms: List[float], failed: int) -> None:
+    with _stats_lock:
+        _totals["writes"] += batch_size
+        _totals["failed"] += failed
+        _totals["batches"] += 1
+        _totals["commit_s"] += commit_s
+        _batch_sizes.append(batch_size)
+        _latencies_ms.extend(latencies_ms)
+
+
+def _writer_loop() -> None:
+    while True:
+        # Writes whose caller already gave up were cancelled and are dropped here.
+        batch = [item for item in _collect_batch() if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            continue
+        started_at = time.perf_counter()
+        try:
+            results: List[Any] = apply_write_batch([write for write, _, _ in batch])
+        except Exception as exc:
+            logger.exception("Document write batch of %d failed", len(batch))
+            results = [exc] * len(batch)
+        commit_s = time.perf_counter() - started_at
+
+        finished_at = time.perf_counter()
+        failed = 0
+        latencies: List[float] = []
+        for (_, future, submitted_at), result in zip(batch, results):
+            latencies.append((finished_at - submitted_at) * 1000.0)
+            if isinstance(result, Exception):
+                failed += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        _record(len(batch), commit_s, latencies, failed)
+        logger.info("Committed %d document write(s) in %.1f ms", len(batch), commit_s * 1000.0)
+
+
+def start_writer() -> None:
+    global _writer_started
+    with _writer_lock:
+        if _writer_started:
+            return
+        threading.Thread(target=_writer_loop, name="document-writer", daemon=True).start()
+        _writer_started = True
+
+
+def submit(write: DocumentWrite, timeout: Optional[float] = WRITE_TIMEOUT_S) -> Any:
+    start_writer()
+    future: Future = Future()
+    _QUEUE.put((write, future, time.perf_counter()))
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        if future.cancel():
+            raise WriteTimeoutError(
+                f"Write was not started within {timeout:g}s and was discarded", started=False
+            ) from None
+        raise WriteTimeoutError(
+            f"Write did not finish within {timeout:g}s and may still be applied", started=True
+        ) from None
+
+
+def write_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        latencies = np.asarray(_latencies_ms, dtype=np.float64)
+        batch_sizes = np.asarray(_batch_sizes, dtype=np.float64)
+        totals = dict(_totals)
+
+    stats: Dict[str, Any] = {
+        "writes": totals["writes"],
+        "failed": totals["failed"],
+        "batches": totals["batches"],
+        "queue_depth": _QUEUE.qsize(),
+        "avg_batch_size": round(float(batch_sizes.mean()), 2) if batch_sizes.size else 0.0,
+        "avg_commit_ms": round(totals["commit_s"] * 1000.0 / totals["batches"], 2) if totals["batches"] else 0.0,
+        "throughput_per_s": round(totals["writes"] / totals["commit_s"], 2) if totals["commit_s"] > 0 else 0.0,
+    }
+    if latencies.size:
+        stats["latency_ms_p50"] = round(float(np.percentile(latencies, 50)), 2)
+        stats["latency_ms_p95"] = round(float(np.percentile(latencies, 95)), 2)
+        stats["latency_ms_max"] = round(float(latencies.max()), 2)
+    return stats